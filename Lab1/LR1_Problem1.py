@@ -1,16 +1,17 @@
+import argparse
+import sys
+import time
+
+import stats
+from filestats import DTYPES, file_stats, read_text_numbers
+
+
 def median(numbers):
     if not numbers:
         raise ValueError("Cannot compute median of empty list")
     
-    sorted_nums = sorted(numbers)
-    n = len(sorted_nums)
-    
-    if n % 2 == 1:
-        return sorted_nums[n // 2]
-    else:
-        mid1 = sorted_nums[n // 2 - 1]
-        mid2 = sorted_nums[n // 2]
-        return (mid1 + mid2) / 2
+    # Quickselect on a copy instead of sorting the whole list
+    return stats.select_median(numbers, copy=True)
 
 
 def mode(numbers):
@@ -35,8 +36,86 @@ def mean(numbers):
     return sum(numbers) / len(numbers)
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Calculate the mean, median and mode of numbers.")
+    parser.add_argument('--file', help="raw binary or .npy file of numbers to read instead of prompting")
+    parser.add_argument('--input', metavar='PATH',
+                        help="text file of whitespace separated numbers, or - for stdin")
+    parser.add_argument('--show-limit', type=int, default=20,
+                        help="largest data set printed in full with --input (default: 20)")
+    parser.add_argument('--dtype', default='float64', choices=list(DTYPES),
+                        help="element type of a raw binary file (default: float64)")
+    parser.add_argument('--chunk-size', type=int, default=1 << 20,
+                        help="number of values processed per chunk (default: 1048576)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes for --file, 0 for one per CPU (default: 1)")
+    return parser.parse_args(argv)
+
+
+def file_main(args):
+    """Calculate statistics for a memory-mapped binary file"""
+    try:
+        result = file_stats(args.file, args.dtype, args.chunk_size, args.workers)
+
+        print(f"File: {args.file} ({result['count']} values)")
+        print(f"Mean: {result['mean']}")
+        print(f"Median: {result['median']}")
+        print(f"Mode: {result['mode']}")
+
+    except FileNotFoundError:
+        print(f"Error: File '{args.file}' not found.")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+
+
+def bulk_main(args):
+    """Calculate statistics for a large text file of numbers"""
+    try:
+        start = time.perf_counter()
+        if args.input == '-':
+            numbers, size = read_text_numbers(sys.stdin.buffer)
+        else:
+            with open(args.input, 'rb') as file:
+                numbers, size = read_text_numbers(file)
+        parsed = time.perf_counter()
+        if len(numbers) == 0:
+            raise ValueError("Cannot compute statistics of an empty input")
+
+        if len(numbers) <= args.show_limit:
+            print(f"Data: {list(numbers)}")
+        else:
+            print(f"Data: {len(numbers)} values (not shown)")
+        print(f"Mean: {stats.mean(numbers)}")
+        print(f"Median: {stats.median(numbers)}")
+        print(f"Mode: {stats.mode(numbers)}")
+        computed = time.perf_counter()
+
+        parse_time = max(parsed - start, 1e-9)
+        compute_time = max(computed - parsed, 1e-9)
+        print(f"Parsed {size / 1e6:.1f} MB in {parse_time:.3f}s "
+              f"({size / 1e6 / parse_time:.1f} MB/s, {len(numbers) / parse_time:,.0f} values/s)")
+        print(f"Computed statistics in {compute_time:.3f}s "
+              f"({len(numbers) / compute_time:,.0f} values/s)")
+
+    except FileNotFoundError:
+        print(f"Error: File '{args.input}' not found.")
+    except ValueError as e:
+        if "could not convert" in str(e):
+            print("Error: Please enter only valid numbers separated by spaces.")
+        else:
+            print(f"Error: {e}")
+
+
+def main(argv=None):
     """Main function to get user input and calculate statistics"""
+    args = parse_args(argv)
+    if args.file:
+        file_main(args)
+        return
+    if args.input:
+        bulk_main(args)
+        return
+
     try:
         user_input = input("Enter numbers separated by spaces: ")
         numbers = [float(x) for x in user_input.split()]
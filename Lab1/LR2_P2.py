@@ -1,13 +1,101 @@
-def main():
-    filename = input("Enter the filename: ")
+import argparse
+import re
+import sys
+
+from lineindex import open_index
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Show lines of a text file by number.")
+    parser.add_argument('filename', nargs='?', help="file to open (prompted for if omitted)")
+    parser.add_argument('--follow', action='store_true',
+                        help="pick up lines appended to the file while viewing it")
+    parser.add_argument('--queries', metavar='FILE',
+                        help="answer the queries in FILE (- for stdin) without prompting; "
+                             "a query starting with / is a regex search")
+    parser.add_argument('--sidecar', action='store_true',
+                        help="save the line index next to the file as <file>.idx and reuse it "
+                             "while the file is unchanged")
+    parser.add_argument('--cache-mb', type=float, default=64,
+                        help="memory for recently read lines, 0 to turn it off (default: 64)")
+    return parser.parse_args(argv)
+
+
+def parse_query(text):
+    """Turn '5', '100-200', '5,17,9000' or a mix of them into (first, last) ranges."""
+    ranges = []
+    for part in text.split(','):
+        first, dash, last = part.partition('-')
+        first = int(first)
+        last = int(last) if dash else first
+        if first > last:
+            raise ValueError(f"range {first}-{last} is backwards")
+        ranges.append((first, last))
+    return ranges
+
+
+def in_range(ranges, count):
+    return all(1 <= first and last <= count for first, last in ranges)
+
+
+def write_lines(lines, ranges, out):
+    """Write the requested lines in file order to a binary buffered stream."""
+    for number, raw in lines.iter_ranges(ranges):
+        out.write(b'Line %d: %s\n' % (number, raw))
+
+
+def write_matches(lines, pattern, out, limit=None, live=False):
+    """Write lines matching pattern as they are found; returns the number written.
+
+    With live=True each hit is flushed straight away so the first results
+    show up while the rest of the file is still being searched.
+    """
+    found = 0
+    for number, raw in lines.search(pattern):
+        if limit is not None and found == limit:
+            out.write(b'(stopped after %d matches)\n' % limit)
+            break
+        out.write(b'Line %d: %s\n' % (number, raw))
+        if live:
+            out.flush()
+        found += 1
+    return found
+
+
+def run_queries(lines, queries, out):
+    for query in queries:
+        query = query.strip()
+        if not query or query.startswith('#'):
+            continue
+        if query.startswith('/'):
+            try:
+                write_matches(lines, query[1:], out)
+            except re.error as e:
+                out.write(f"Invalid pattern '{query[1:]}': {e}.\n".encode())
+            continue
+        try:
+            ranges = parse_query(query)
+        except ValueError:
+            out.write(f"Invalid query '{query}'.\n".encode())
+            continue
+        if not in_range(ranges, len(lines)):
+            out.write(f"Invalid query '{query}': lines are numbered 1-{len(lines)}.\n".encode())
+            continue
+        write_lines(lines, ranges, out)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    filename = args.filename or input("Enter the filename: ")
     
     try:
-        with open(filename, 'r') as file:
-            lines = file.readlines()
-        
-        lines = [line.rstrip('\n') for line in lines]
-        print(f"File '{filename}' loaded successfully!")
-        print()
+        # Only newline offsets (or gzip checkpoints) are loaded; lines are
+        # read on demand
+        lines = open_index(filename, sidecar=args.sidecar,
+                           cache_bytes=int(args.cache_mb * (1 << 20)))
+        if not args.queries:
+            print(f"File '{filename}' loaded successfully!")
+            print()
         
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found.")
@@ -16,27 +104,69 @@ def main():
         print(f"Error reading file: {e}")
         return
     
+    if args.queries:
+        out = open(sys.stdout.fileno(), 'wb', buffering=1 << 20, closefd=False)
+        try:
+            if args.queries == '-':
+                run_queries(lines, sys.stdin, out)
+            else:
+                with open(args.queries) as queries:
+                    run_queries(lines, queries, out)
+        except FileNotFoundError:
+            print(f"Error: File '{args.queries}' not found.")
+        finally:
+            out.close()
+            lines.close()
+        return
+    
     while True:
+        if args.follow:
+            before = len(lines)
+            change = lines.refresh()
+            if change == 'grown':
+                print(f"{len(lines) - before} new line(s) appended.")
+            elif change == 'rebuilt':
+                print("The file was truncated or replaced; index rebuilt.")
         print(f"The file has {len(lines)} lines.")
         
+        query = input("Enter a line number, range (100-200), list (5,17,9000) or /pattern "
+                      "from 1-{}, or 0 to quit: ".format(len(lines)))
+        
+        if query.startswith('/'):
+            sys.stdout.flush()
+            try:
+                found = write_matches(lines, query[1:], sys.stdout.buffer, limit=50, live=True)
+                sys.stdout.buffer.flush()
+                print(f"{found} matching line(s) shown.")
+            except re.error as e:
+                print(f"Invalid pattern: {e}")
+            print()
+            continue
+        
         try:
-            line_number = int(input("Enter a line number (1-{}) or 0 to quit: ".format(len(lines))))
+            ranges = parse_query(query)
         except ValueError:
-            print("Please enter a valid number.")
+            print("Please enter a valid number, range or list.")
             print()
             continue
         
-        if line_number == 0:
+        if ranges == [(0, 0)]:
+            if lines.cache is not None:
+                print(f"Cache: {lines.cache.hits} hits, {lines.cache.misses} misses.")
             print("Goodbye!")
             break
         
-        if line_number < 1 or line_number > len(lines):
-            print(f"Invalid line number. Please enter a number between 1 and {len(lines)}.")
+        if not in_range(ranges, len(lines)):
+            print(f"Invalid line number. Please enter numbers between 1 and {len(lines)}.")
             print()
             continue
         
-        print(f"Line {line_number}: {lines[line_number - 1]}")
+        sys.stdout.flush()
+        write_lines(lines, ranges, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
         print()
+    
+    lines.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""
+File: bench_stats.py
+
+Benchmarks for the functions in stats.py over several input sizes and
+distributions. Each case is timed (best of --repeat runs) and, in a
+separate run under tracemalloc, its peak memory is recorded. Results are
+written as JSON and can be checked against a stored baseline:
+
+    python bench_stats.py --sizes 1e3,1e4,1e5 --save-baseline baseline.json
+    python bench_stats.py --sizes 1e3,1e4,1e5 --baseline baseline.json
+
+The second command exits with status 1 and lists every case that got
+slower or used more memory than the baseline allows. Each case is run at
+least --repeat times and until --min-time seconds have been spent on it,
+so fast cases get many more runs to take the best of. Cases whose
+baseline time is under --min-seconds are too close to timer and
+scheduler noise to judge; they are listed as skipped, not failed.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+
+import LR1_Problem1
+import stats
+from stats import np
+
+DISTRIBUTIONS = ('uniform', 'skewed', 'duplicates', 'sorted')
+
+
+def make_data(distribution, size, seed=0):
+    """size values from the named distribution as an array('d')."""
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        if distribution == 'skewed':
+            values = rng.pareto(1.5, size)
+        elif distribution == 'duplicates':
+            values = rng.integers(0, 100, size).astype(np.float64)
+        else:
+            values = rng.random(size)
+        if distribution == 'sorted':
+            values.sort()
+        return array('d', values.tobytes())
+
+    rng = random.Random(seed)
+    if distribution == 'skewed':
+        values = array('d', (rng.paretovariate(1.5) - 1 for _ in range(size)))
+    elif distribution == 'duplicates':
+        values = array('d', (rng.randrange(100) for _ in range(size)))
+    else:
+        values = array('d', (rng.random() for _ in range(size)))
+    if distribution == 'sorted':
+        values = array('d', sorted(values))
+    return values
+
+
+# name -> (input kind, function); 'list' cases get a Python list of floats,
+# 'buffer' cases get the array('d') itself
+CASES = {
+    'mean': ('list', stats.mean),
+    'median': ('list', stats.median),
+    'mode': ('list', stats.mode),
+    'select_median': ('list', lambda numbers: stats.select_median(numbers, copy=True)),
+    'quantiles': ('list', lambda numbers: stats.quantiles(numbers, [0.5, 0.9, 0.95, 0.99])),
+    'running_stats': ('list', lambda numbers: stats.RunningStats(numbers).variance()),
+    'sketch_median': ('list', lambda numbers: stats.QuantileSketch(seed=0).update(numbers).median()),
+    'buffer_mean': ('buffer', stats.mean),
+    'buffer_median': ('buffer', stats.median),
+    'buffer_mode': ('buffer', stats.mode),
+    'buffer_quantiles': ('buffer', lambda numbers: stats.quantiles(numbers, [0.5, 0.9, 0.95, 0.99])),
+    # The functions the LR1_Problem1.py prompt uses
+    'lr1_mean': ('list', LR1_Problem1.mean),
+    'lr1_median': ('list', LR1_Problem1.median),
+    'lr1_mode': ('list', LR1_Problem1.mode),
+}
+
+
+def time_case(function, numbers, repeat, min_time=0.2, max_runs=1000):
+    """Best time of at least repeat runs, continued until min_time has passed.
+
+    The garbage collector is paused while timing, as timeit does.
+    """
+    best = None
+    runs = 0
+    spent = 0.0
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while runs < repeat or (spent < min_time and runs < max_runs):
+            start = time.perf_counter()
+            function(numbers)
+            elapsed = time.perf_counter() - start
+            spent += elapsed
+            runs += 1
+            if best is None or elapsed < best:
+                best = elapsed
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+
+def peak_memory(function, numbers):
+    tracemalloc.start()
+    try:
+        function(numbers)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes, distributions, cases, repeat=3, measure_memory=True, max_list_size=10 ** 7,
+        min_time=0.2, rounds=5, only=None):
+    """Time every case over every size and distribution.
+
+    The cases for one data set are timed in rounds, each case getting
+    min_time / rounds seconds per round, so a slow spell on a busy
+    machine hits one round of every case instead of all runs of one.
+    only limits the run to a set of (case, distribution, size) keys.
+    """
+    results = []
+    for size in sizes:
+        for distribution in distributions:
+            names = [name for name in cases
+                     if only is None or (name, distribution, size) in only]
+            if not names:
+                continue
+            data = make_data(distribution, size)
+            as_list = data.tolist() if size <= max_list_size else None
+            jobs = []
+            for name in names:
+                kind, function = CASES[name]
+                numbers = data if kind == 'buffer' else as_list
+                if numbers is not None:
+                    jobs.append((name, function, numbers))
+
+            best = {}
+            for _ in range(rounds):
+                for name, function, numbers in jobs:
+                    elapsed = time_case(function, numbers, -(-repeat // rounds), min_time / rounds)
+                    best[name] = min(best.get(name, elapsed), elapsed)
+
+            for name, function, numbers in jobs:
+                result = {
+                    'case': name,
+                    'distribution': distribution,
+                    'size': size,
+                    'seconds': best[name],
+                    'peak_bytes': peak_memory(function, numbers) if measure_memory else None,
+                }
+                results.append(result)
+                print(f"{name:>16} {distribution:>10} {size:>11,} "
+                      f"{result['seconds']:10.4f}s "
+                      f"{(result['peak_bytes'] or 0) / 1e6:10.1f} MB", flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, memory_tolerance=0.10, slack=0.001,
+            min_seconds=0.001, skipped=None, regressed=None):
+    """List of messages for results that regressed against the baseline.
+
+    Timings whose baseline is under min_seconds are not compared; their
+    labels are appended to skipped when a list is passed in. The keys of
+    cases that got slower are appended to regressed in the same way.
+    """
+    previous = {(entry['case'], entry['distribution'], entry['size']): entry
+                for entry in baseline['results']}
+    regressions = []
+    for result in results:
+        key = (result['case'], result['distribution'], result['size'])
+        old = previous.get(key)
+        if old is None:
+            continue
+
+        label = f"{result['case']} / {result['distribution']} / {result['size']:,}"
+        if old['seconds'] < min_seconds:
+            if skipped is not None:
+                skipped.append(label)
+        # Short timings are mostly noise, so allow a fixed slack on top
+        elif result['seconds'] > old['seconds'] * (1 + tolerance) + slack:
+            regressions.append(f"{label}: {result['seconds']:.4f}s vs baseline {old['seconds']:.4f}s")
+            if regressed is not None:
+                regressed.append(key)
+        if (result['peak_bytes'] is not None and old.get('peak_bytes') is not None
+                and result['peak_bytes'] > old['peak_bytes'] * (1 + memory_tolerance) + 4096):
+            regressions.append(f"{label}: peak {result['peak_bytes']:,} bytes "
+                               f"vs baseline {old['peak_bytes']:,} bytes")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the functions in stats.py.")
+    parser.add_argument('--sizes', default='1e3,1e4,1e5,1e6',
+                        help="comma separated input sizes, up to 1e8 (default: 1e3,1e4,1e5,1e6)")
+    parser.add_argument('--distributions', default=','.join(DISTRIBUTIONS),
+                        help=f"comma separated subset of {', '.join(DISTRIBUTIONS)}")
+    parser.add_argument('--cases', default=','.join(CASES),
+                        help="comma separated subset of the benchmark cases (default: all)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="minimum timed runs per case, best is kept (default: 3)")
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="keep repeating a case until this many seconds are spent (default: 0.2)")
+    parser.add_argument('--rounds', type=int, default=5,
+                        help="interleaved timing rounds per data set (default: 5)")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="times to re-time cases that look slower before failing (default: 2)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc runs")
+    parser.add_argument('--max-list-size', type=float, default=1e7,
+                        help="skip list based cases above this size (default: 1e7)")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="fail if results regress against this JSON file")
+    parser.add_argument('--save-baseline', help="write the results to this file as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown as a fraction of the baseline (default: 0.25)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.10,
+                        help="allowed peak memory growth as a fraction (default: 0.10)")
+    parser.add_argument('--slack', type=float, default=0.001,
+                        help="extra seconds allowed on top of the tolerance (default: 0.001)")
+    parser.add_argument('--min-seconds', type=float, default=0.001,
+                        help="do not compare cases faster than this in the baseline (default: 0.001)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(float(size)) for size in args.sizes.split(',')]
+    distributions = args.distributions.split(',')
+    cases = args.cases.split(',')
+    for name in distributions:
+        if name not in DISTRIBUTIONS:
+            print(f"Error: unknown distribution '{name}'")
+            return 2
+    for name in cases:
+        if name not in CASES:
+            print(f"Error: unknown case '{name}'")
+            return 2
+
+    results = run(sizes, distributions, cases, args.repeat, not args.no_memory,
+                  int(args.max_list_size), args.min_time, args.rounds)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        for attempt in range(args.retries + 1):
+            skipped = []
+            regressed = []
+            regressions = compare(results, baseline, args.tolerance, args.memory_tolerance,
+                                  args.slack, args.min_seconds, skipped, regressed)
+            if not regressed or attempt == args.retries:
+                break
+            # A slowdown has to show up again before it counts
+            print(f"\nRe-timing {len(regressed)} case(s) that look slower:")
+            again = run(sizes, distributions, cases, args.repeat, False,
+                        int(args.max_list_size), args.min_time, args.rounds, set(regressed))
+            retimed = {(entry['case'], entry['distribution'], entry['size']): entry
+                       for entry in again}
+            for result in results:
+                entry = retimed.get((result['case'], result['distribution'], result['size']))
+                if entry is not None:
+                    result['seconds'] = min(result['seconds'], entry['seconds'])
+
+        if skipped:
+            print(f"\n{len(skipped)} case(s) under {args.min_seconds}s not compared.")
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for message in regressions:
+                print(f"  {message}")
+            status = 1
+        else:
+            print(f"\nNo regressions against {args.baseline}.")
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__ if np is not None else None,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
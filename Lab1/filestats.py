@@ -0,0 +1,205 @@
+"""
+File: filestats.py
+
+Mean, median and mode of numeric files that are too large to handle as
+Python lists. Binary files are memory-mapped and handed to the chunked
+functions in stats.py one slice at a time, so peak memory stays bounded
+by the chunk size instead of the file size. Text files are parsed in
+large blocks into a compact array of doubles.
+"""
+
+import ast
+import mmap
+import os
+import struct
+import sys
+import warnings
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from stats import chunked_stats, np
+
+NPY_MAGIC = b'\x93NUMPY'
+
+# dtype name -> (memoryview format, item size)
+DTYPES = {
+    'float64': ('d', 8),
+    'int64': ('q', 8),
+    'float32': ('f', 4),
+    'int32': ('i', 4),
+}
+
+NPY_DESCRS = {
+    'f8': 'float64',
+    'i8': 'int64',
+    'f4': 'float32',
+    'i4': 'int32',
+}
+
+
+def read_npy_header(file):
+    """Return (data offset, dtype name, count) for an open .npy file."""
+    if file.read(6) != NPY_MAGIC:
+        raise ValueError("Not a .npy file")
+
+    major = file.read(2)[0]
+    if major == 1:
+        (length,) = struct.unpack('<H', file.read(2))
+    else:
+        (length,) = struct.unpack('<I', file.read(4))
+    header = ast.literal_eval(file.read(length).decode('latin1'))
+
+    descr = header['descr']
+    native = '<' if sys.byteorder == 'little' else '>'
+    if descr[0] in '<>' and descr[0] != native:
+        raise ValueError(f"Unsupported byte order in .npy file: {descr}")
+    if descr.lstrip('<>=|') not in NPY_DESCRS:
+        raise ValueError(f"Unsupported .npy dtype: {descr}")
+
+    count = 1
+    for dimension in header['shape']:
+        count *= dimension
+    return file.tell(), NPY_DESCRS[descr.lstrip('<>=|')], count
+
+
+class NumberFile:
+    """Read-only memory-mapped view of a raw or .npy numeric file.
+
+    Raw files are read as a flat run of the given dtype (native byte
+    order); .npy files carry their own dtype and shape in the header.
+    chunks() yields memoryview slices of the mapping, which never copy.
+    """
+
+    def __init__(self, path, dtype='float64'):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}', expected one of {list(DTYPES)}")
+
+        self.path = path
+        self._file = open(path, 'rb')
+        offset = 0
+        if path.endswith('.npy'):
+            offset, dtype, count = read_npy_header(self._file)
+        self.dtype = dtype
+        typecode, itemsize = DTYPES[dtype]
+
+        self._file.seek(0, 2)
+        size = self._file.tell()
+        if not path.endswith('.npy'):
+            count = (size - offset) // itemsize
+
+        if count == 0:
+            self._map = None
+            self.values = memoryview(b'').cast(typecode)
+        else:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.values = memoryview(self._map)[offset:offset + count * itemsize].cast(typecode)
+
+    def __len__(self):
+        return len(self.values)
+
+    def chunks(self, chunk_size=1 << 20):
+        return [self.values[start:start + chunk_size]
+                for start in range(0, len(self.values), chunk_size)]
+
+    def close(self):
+        self.values.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Files mapped inside this process on behalf of FileChunk.load()
+_open_files = {}
+
+
+class FileChunk:
+    """Picklable reference to a range of values in a NumberFile.
+
+    Only the path and the range cross the process boundary; each worker
+    maps the file once and slices it locally.
+    """
+
+    def __init__(self, path, dtype, start, stop):
+        self.path = path
+        self.dtype = dtype
+        self.start = start
+        self.stop = stop
+
+    def load(self):
+        key = (self.path, self.dtype)
+        if key not in _open_files:
+            _open_files[key] = NumberFile(self.path, self.dtype)
+        return _open_files[key].values[self.start:self.stop]
+
+
+def file_stats(path, dtype='float64', chunk_size=1 << 20, workers=1):
+    """Count, mean, variance, median and mode of a binary numeric file.
+
+    With workers > 1 every pass runs in a process pool and the workers
+    read their chunks straight from the mapped file.
+    """
+    with NumberFile(path, dtype) as numbers:
+        if len(numbers) == 0:
+            raise ValueError("Cannot compute statistics of an empty file")
+
+        if workers != 1:
+            chunks = [FileChunk(path, dtype, start, start + chunk_size)
+                      for start in range(0, len(numbers), chunk_size)]
+            with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+                return chunked_stats(chunks, pool.map)
+
+        chunks = numbers.chunks(chunk_size)
+        try:
+            return chunked_stats(chunks)
+        finally:
+            for chunk in chunks:
+                chunk.release()
+
+
+def _parse_block(text):
+    if np is not None:
+        # Depending on the NumPy version a bad token either raises or only
+        # warns and truncates, so turn the warning into an error as well
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            try:
+                parsed = np.fromstring(text, dtype=np.float64, sep=' ')
+            except (DeprecationWarning, ValueError):
+                raise ValueError("could not convert the input to numbers") from None
+        return parsed.tobytes()
+    return array('d', map(float, text.split())).tobytes()
+
+
+def read_text_numbers(stream, block_size=1 << 24):
+    """Parse whitespace separated numbers from a binary stream.
+
+    The stream is read block_size bytes at a time; a number cut in half at
+    the end of a block is carried over to the next one. Values are stored
+    as raw doubles in an array('d'), 8 bytes each, rather than as a list of
+    float objects. Returns (values, bytes read).
+    """
+    values = array('d')
+    carry = b''
+    size = 0
+    while True:
+        block = stream.read(block_size)
+        size += len(block)
+        if not block:
+            break
+
+        block = carry + block
+        cut = max(block.rfind(space) for space in (b' ', b'\n', b'\t', b'\r'))
+        carry = block[cut + 1:]
+        text = block[:cut + 1].decode('ascii', errors='replace')
+        if text.strip():
+            values.frombytes(_parse_block(text))
+
+    if carry.strip():
+        values.frombytes(_parse_block(carry.decode('ascii', errors='replace')))
+    return values, size
@@ -1,4 +1,16 @@
 import random
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Word list (0 articles, 1 nouns, 2 verbs, 3 prepositions) of each word
+# in a sentence, in the order sentence() picks them
+SENTENCE_SHAPE = (0, 1, 2, 0, 1, 3, 0, 1)
+BLOCK = 1 << 16
 
 def getWords(filename):
     try:
@@ -48,6 +60,34 @@ def verbPhrase():
 def prepositionalPhrase():
     return random.choice(prepositions) + " " + nounPhrase()
 
+def generate(n, vocabulary=None, seed=None, first=None):
+    """Return n sentences as one string, one per line.
+
+    Instead of one random.choice per word, all n words for each position
+    of the sentence are drawn in a single call (NumPy when available,
+    random.choices otherwise). The columns are then zipped into sentences
+    and joined once, so the text is built in one allocation. When first
+    is given the sentences are numbered from it, as main() prints them.
+    """
+    if vocabulary is None:
+        vocabulary = (articles, nouns, verbs, prepositions)
+    if n <= 0:
+        return ""
+    
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        lists = [np.array(words, dtype=object) for words in vocabulary]
+        columns = [lists[kind][rng.integers(len(lists[kind]), size=n)].tolist()
+                   for kind in SENTENCE_SHAPE]
+    else:
+        rng = random.Random(seed)
+        columns = [rng.choices(vocabulary[kind], k=n) for kind in SENTENCE_SHAPE]
+    
+    sentences = map(" ".join, zip(*columns))
+    if first is not None:
+        sentences = map("{}. {}".format, range(first, first + n), sentences)
+    return "\n".join(sentences) + "\n"
+
 def main():
     global articles, nouns, verbs, prepositions
     
@@ -64,8 +104,13 @@ def main():
         number = int(input("Enter the number of sentences: "))
         print()
         
-        for count in range(number):
-            print(f"{count + 1}. {sentence()}")
+        start = time.perf_counter()
+        for first in range(1, number + 1, BLOCK):
+            sys.stdout.write(generate(min(BLOCK, number + 1 - first), first=first))
+        elapsed = time.perf_counter() - start
+        print()
+        print(f"{number} sentences in {elapsed:.3f} seconds "
+              f"({number / max(elapsed, 1e-9):,.0f} sentences/sec)")
             
     except ValueError:
         print("Error: Please enter a valid number.")
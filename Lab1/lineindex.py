@@ -0,0 +1,700 @@
+"""
+File: lineindex.py
+
+Random access to the lines of very large text files. The file is scanned
+once for newlines and the byte offset where each line starts is kept in
+an array('Q'), 8 bytes per line. Lines are then read by slicing a
+read-only mmap of the file, so fetching line N is O(1) and the file's
+contents are never loaded as a whole.
+
+Files above PARALLEL_THRESHOLD bytes are scanned by a process pool, each
+worker taking one byte range of the file.
+
+With sidecar=True the offsets are also saved next to the file in a
+sidecar (<file>.idx) and reused by later opens. It records the file's
+size and modification time and is only reused while both still match;
+a reused sidecar is itself memory-mapped.
+
+Gzip files cannot be mapped, so GzipLineIndex keeps decompressor
+checkpoints instead; open_index() picks the right class for a file.
+
+Both classes can keep recently read data in a byte-bounded LRU cache
+(cache_bytes=...) so paging back and forth does not go to the file, or
+re-inflate it, again; sequential reads also fetch a little ahead.
+"""
+
+import bisect
+import itertools
+import mmap
+import os
+import re
+import struct
+import zlib
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SIDECAR_SUFFIX = '.idx'
+SIDECAR_MAGIC = b'LINEIDX1'
+# magic, file size, file mtime in ns, number of offsets
+SIDECAR_HEADER = struct.Struct('<8sQQQ')
+
+SCAN_BLOCK = 1 << 24
+GZIP_MAGIC = b'\x1f\x8b'
+READ_BLOCK = 1 << 16
+CHECKPOINT_SPACING = 1 << 23
+PARALLEL_THRESHOLD = 1 << 28
+MIN_RANGE = 1 << 26
+CACHE_BLOCK = 1 << 16
+# Bytes an LRUCache entry costs on top of its value: the bytes object
+# header, the key and the OrderedDict slot and links (about 180 measured)
+CACHE_ENTRY_OVERHEAD = 200
+
+
+def scan_newlines(data, start=0, end=None):
+    """array('Q') of the offsets just past each newline in data[start:end].
+
+    data is anything sliceable with a find() method, normally an mmap.
+    NumPy, when present, compares whole blocks at once; otherwise
+    bytes.find does the searching.
+    """
+    if end is None:
+        end = len(data)
+    offsets = array('Q')
+
+    if np is not None:
+        for block_start in range(start, end, SCAN_BLOCK):
+            count = min(SCAN_BLOCK, end - block_start)
+            block = np.frombuffer(data, dtype=np.uint8, count=count, offset=block_start)
+            found = np.flatnonzero(block == 10).astype(np.uint64)
+            found += block_start + 1
+            offsets.frombytes(found.tobytes())
+            del block
+        return offsets
+
+    find = data.find
+    position = find(b'\n', start, end)
+    while position != -1:
+        offsets.append(position + 1)
+        position = find(b'\n', position + 1, end)
+    return offsets
+
+
+def _scan_range(path, start, end):
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return scan_newlines(data, start, end).tobytes()
+
+
+def build_offsets(path, size, workers=None):
+    """Newline offsets of the first size bytes of path, scanned in parallel.
+
+    The file is cut into byte ranges of at least MIN_RANGE bytes, a few
+    per worker, and each worker maps the file and scans its own range.
+    The partial arrays come back in file order and are simply joined.
+    """
+    workers = workers or os.cpu_count() or 1
+    parts = max(1, min(workers * 4, size // MIN_RANGE))
+    bounds = [size * part // parts for part in range(parts + 1)]
+
+    offsets = array('Q')
+    with ProcessPoolExecutor(workers) as pool:
+        for found in pool.map(_scan_range, [path] * parts, bounds[:-1], bounds[1:]):
+            offsets.frombytes(found)
+    return offsets
+
+
+def strip_newline(raw):
+    if raw.endswith(b'\n'):
+        raw = raw[:-1]
+        if raw.endswith(b'\r'):
+            raw = raw[:-1]
+    return raw
+
+
+def sidecar_path(path):
+    return path + SIDECAR_SUFFIX
+
+
+def read_at(file, position, size):
+    """Read size bytes at position without moving other readers of the file.
+
+    Each caller passes its own position, so generators taking turns on
+    one file object never see each other's reads.
+    """
+    if hasattr(os, 'pread'):
+        return os.pread(file.fileno(), size, position)
+    file.seek(position)
+    return file.read(size)
+
+
+class LRUCache:
+    """Least recently used cache of bytes values, bounded by their total size.
+
+    get() counts a hit or a miss; once the entries put() in add up to more
+    than budget bytes the oldest ones are dropped. Each entry is charged
+    its length plus CACHE_ENTRY_OVERHEAD, so many small values (single
+    lines, empty ones included) cannot hold far more memory than budget.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.discard(key)
+        self._items[key] = value
+        self.used += len(value) + CACHE_ENTRY_OVERHEAD
+        while self.used > self.budget and self._items:
+            _, old = self._items.popitem(last=False)
+            self.used -= len(old) + CACHE_ENTRY_OVERHEAD
+
+    def discard(self, key):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.used -= len(old) + CACHE_ENTRY_OVERHEAD
+
+    def clear(self):
+        self._items.clear()
+        self.used = 0
+
+
+class BlockCache(LRUCache):
+    """Fixed size blocks of an open file, kept in an LRU cache.
+
+    read() serves any byte range from cached blocks and fetches all the
+    blocks it is missing with a single read. When a read starts in or
+    right after the block where the previous one ended, the next
+    readahead blocks are fetched along with it.
+    """
+
+    def __init__(self, file, budget, block_size=CACHE_BLOCK, readahead=4):
+        super().__init__(budget)
+        self.file = file
+        self.block_size = block_size
+        self.readahead = readahead
+        self._last = None
+
+    def _read_at(self, position, size):
+        return read_at(self.file, position, size)
+
+    def read(self, start, end):
+        if start >= end:
+            return b''
+        size = self.block_size
+        first = start // size
+        last = (end - 1) // size
+        sequential = self._last is not None and self._last <= first <= self._last + 1
+        self._last = last
+
+        found = {}
+        missing = []
+        for number in range(first, last + 1):
+            block = self.get(number)
+            if block is None:
+                missing.append(number)
+            else:
+                found[number] = block
+
+        fetch_last = last
+        if sequential and last + 1 not in self._items:
+            fetch_last = last + self.readahead
+        if missing or fetch_last > last:
+            fetch_first = missing[0] if missing else last + 1
+            data = self._read_at(fetch_first * size, (fetch_last - fetch_first + 1) * size)
+            for number in range(fetch_first, fetch_last + 1):
+                block = data[(number - fetch_first) * size:(number - fetch_first + 1) * size]
+                if not block:
+                    break
+                if number in missing:
+                    found[number] = block
+                if number not in self._items:
+                    self.put(number, block)
+
+        if first == last:
+            return found[first][start - first * size:end - first * size]
+        data = b''.join(found[number] for number in range(first, last + 1))
+        return data[start - first * size:end - first * size]
+
+    def invalidate(self, position):
+        """Forget the block holding position, e.g. the old end of a growing file."""
+        self.discard(position // self.block_size)
+
+
+class LineIndex:
+    """Line-number access to a text file through a newline offset index.
+
+    offsets[i] is the byte where line i + 1 starts and offsets[-1] is the
+    end of the file, so len(offsets) - 1 lines are available. Lines are
+    numbered from 1 like in the viewer. workers controls how a missing
+    index is built: 1 scans in this process, None picks a process pool
+    for files above PARALLEL_THRESHOLD bytes. With cache_bytes set, lines
+    are read through a BlockCache of that size instead of the mmap.
+    """
+
+    def __init__(self, path, sidecar=False, workers=None, cache_bytes=None):
+        self.path = path
+        self.sidecar = sidecar
+        self.workers = workers
+        self.cache_bytes = cache_bytes
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self._identity = (stat.st_dev, stat.st_ino)
+        self.cache = BlockCache(self._file, self.cache_bytes) if self.cache_bytes else None
+        self._map = None
+        if self.size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._sidecar_map = None
+        self._changed = False
+        self.offsets = self._load_sidecar() if self.sidecar else None
+        if self.offsets is None:
+            self.offsets = self._build()
+            if self.sidecar:
+                self.save_sidecar()
+
+    def refresh(self):
+        """Bring the index up to date with a file that may have changed.
+
+        Appended bytes are scanned from the start of the last, possibly
+        unfinished, line onwards, so a growing log is never rescanned.
+        If the file got shorter or the path now names a different file
+        (log rotation), the index is rebuilt. Returns 'grown', 'rebuilt'
+        or None when nothing changed.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # Rotated away and not recreated yet; keep serving the old file
+            return None
+
+        if (stat.st_dev, stat.st_ino) != self._identity or stat.st_size < self.size:
+            self._close_maps()
+            self._file.close()
+            self._open()
+            return 'rebuilt'
+        if stat.st_size == self.size:
+            return None
+
+        if not isinstance(self.offsets, array):
+            offsets = array('Q', self.offsets)
+            self._close_sidecar()
+            self.offsets = offsets
+
+        old_size = self.size
+        new_map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map is not None:
+            self._map.close()
+        self._map = new_map
+        self.size = len(new_map)
+        self.mtime_ns = os.fstat(self._file.fileno()).st_mtime_ns
+        if self.cache is not None:
+            self.cache.invalidate(old_size)
+
+        # Drop the end marker of an unfinished last line before rescanning
+        if len(self.offsets) > 1 and self.offsets[-1] == old_size and new_map[old_size - 1] != 10:
+            self.offsets.pop()
+        self.offsets.extend(scan_newlines(new_map, old_size, self.size))
+        if self.offsets[-1] != self.size:
+            self.offsets.append(self.size)
+        self._changed = True
+        return 'grown'
+
+    def _build(self):
+        offsets = array('Q', [0])
+        parallel = self.workers != 1 and (self.workers or self.size >= PARALLEL_THRESHOLD)
+        if self._map is not None and parallel:
+            offsets.extend(build_offsets(self.path, self.size, self.workers))
+        elif self._map is not None:
+            offsets.extend(scan_newlines(self._map))
+        # A last line without a trailing newline still counts
+        if offsets[-1] != self.size:
+            offsets.append(self.size)
+        return offsets
+
+    def _load_sidecar(self):
+        try:
+            with open(sidecar_path(self.path), 'rb') as file:
+                header = file.read(SIDECAR_HEADER.size)
+                if len(header) != SIDECAR_HEADER.size:
+                    return None
+                magic, size, mtime_ns, count = SIDECAR_HEADER.unpack(header)
+                if (magic, size, mtime_ns) != (SIDECAR_MAGIC, self.size, self.mtime_ns):
+                    return None
+                self._sidecar_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        view = memoryview(self._sidecar_map)[SIDECAR_HEADER.size:]
+        if len(view) != count * 8:
+            view.release()
+            self._sidecar_map.close()
+            self._sidecar_map = None
+            return None
+        return view.cast('Q')
+
+    def save_sidecar(self):
+        """Write the offsets next to the file; silently skipped if not allowed."""
+        path = sidecar_path(self.path)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, 'wb') as file:
+                file.write(SIDECAR_HEADER.pack(SIDECAR_MAGIC, self.size, self.mtime_ns,
+                                               len(self.offsets)))
+                file.write(self.offsets.tobytes())
+            os.replace(temporary, path)
+        except OSError:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def line_bytes(self, number):
+        if not 1 <= number <= len(self):
+            raise IndexError(f"line {number} is out of range 1-{len(self)}")
+        return strip_newline(self._read(self.offsets[number - 1], self.offsets[number]))
+
+    def _read(self, start, end):
+        if self.cache is None:
+            return self._map[start:end]
+        return self.cache.read(start, end)
+
+    def line(self, number):
+        return self.line_bytes(number).decode('utf-8', errors='replace')
+
+    def iter_ranges(self, ranges, max_span=1 << 22):
+        """Yield (number, raw bytes) for every line in the (first, last) ranges.
+
+        Ranges are merged and served in file order. Neighbouring lines are
+        read together with one slice of up to max_span bytes and split
+        afterwards, so a batch costs one forward pass over the file rather
+        than a separate read per line.
+        """
+        merged = []
+        for first, last in sorted(ranges):
+            if not 1 <= first <= last <= len(self):
+                raise IndexError(f"lines {first}-{last} are out of range 1-{len(self)}")
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+
+        offsets = self.offsets
+        for first, last in merged:
+            number = first
+            while number <= last:
+                base = offsets[number - 1]
+                stop = bisect.bisect_right(offsets, base + max_span, number, last + 1) - 1
+                stop = max(stop, number)
+                block = self._read(base, offsets[stop])
+                for current in range(number, stop + 1):
+                    yield current, strip_newline(block[offsets[current - 1] - base:offsets[current] - base])
+                number = stop + 1
+
+    def search(self, pattern, flags=0):
+        """Yield (number, raw bytes) for each line matching a regex, lazily.
+
+        The compiled pattern runs directly over the mmap, so nothing is
+        copied and the first hits come back without reading the rest of
+        the file. Each match position is turned into a line number by
+        bisecting the offsets, and the search resumes at the next line so
+        every line is reported once. ^ and $ match at line boundaries.
+        """
+        if isinstance(pattern, str):
+            pattern = pattern.encode('utf-8')
+        if isinstance(pattern, bytes):
+            pattern = re.compile(pattern, flags | re.MULTILINE)
+        if self._map is None:
+            return
+
+        offsets = self.offsets
+        position = 0
+        while position < self.size:
+            match = pattern.search(self._map, position)
+            if match is None or (match.start() == self.size and self._map[-1] == 10):
+                # An empty match after the final newline is not on any line
+                return
+            number = bisect.bisect_right(offsets, match.start(), 0, len(offsets) - 1)
+            yield number, strip_newline(self._map[offsets[number - 1]:offsets[number]])
+            position = offsets[number]
+
+    def _close_sidecar(self):
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        if self._sidecar_map is not None:
+            self._sidecar_map.close()
+            self._sidecar_map = None
+
+    def _close_maps(self):
+        self._close_sidecar()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def close(self):
+        # Keep the sidecar in step with any growth picked up by refresh()
+        if self._changed and self.sidecar:
+            self.save_sidecar()
+        self._close_maps()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GzipLineIndex:
+    """Line-number access to a gzip file through decompressor checkpoints.
+
+    The file is decompressed once while counting newlines. Roughly every
+    spacing bytes of output a copy of the zlib decompressor is kept,
+    together with the compressed offset it has read up to and the number
+    of newlines before that point. Fetching line N resumes from the last
+    checkpoint before it and decompresses at most about spacing bytes,
+    instead of everything from the start of the file.
+
+    Python's zlib cannot re-prime a raw inflate stream at a bit offset, so
+    checkpoints are in-memory decompressor copies (around 40 KB each)
+    rather than saved dictionaries, and the index is rebuilt per session.
+    Multi-member files (as written by concatenating .gz files) are handled.
+
+    With cache_bytes set, decompressed lines are kept in an LRUCache and a
+    run of lines that continues the previous one also inflates the next
+    readahead lines.
+    """
+
+    def __init__(self, path, spacing=CHECKPOINT_SPACING, cache_bytes=None, readahead=256):
+        self.path = path
+        self.spacing = spacing
+        self.cache = LRUCache(cache_bytes) if cache_bytes else None
+        self.readahead = readahead
+        self._last = None
+        self._file = open(path, 'rb')
+        self._build()
+
+    def _chunks(self, decompressor, compressed_position):
+        """Yield (output, compressed position, decompressor) from a point on.
+
+        The decompressor is only passed along when it has consumed every
+        byte up to the compressed position, i.e. when it is safe to resume
+        from; otherwise it is None.
+        """
+        while True:
+            data = read_at(self._file, compressed_position, READ_BLOCK)
+            if not data:
+                return
+            compressed_position += len(data)
+            while data:
+                output = decompressor.decompress(data)
+                data = b''
+                if decompressor.eof:
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(31)
+                    if not data.strip(b'\0'):
+                        # Zero padding after the last member
+                        data = b''
+                if output:
+                    yield output, compressed_position, None if data else decompressor
+
+    def _build(self):
+        start = zlib.decompressobj(31)
+        # (newlines before, uncompressed position, compressed position, decompressor)
+        self.checkpoints = [(0, 0, 0, start.copy())]
+        newlines = 0
+        position = 0
+        last = b'\n'
+        try:
+            for output, compressed_position, decompressor in self._chunks(start, 0):
+                newlines += output.count(b'\n')
+                position += len(output)
+                last = output[-1:]
+                if decompressor and position - self.checkpoints[-1][1] >= self.spacing:
+                    self.checkpoints.append((newlines, position, compressed_position,
+                                             decompressor.copy()))
+        except zlib.error as e:
+            raise ValueError(f"'{self.path}' is not a valid gzip file: {e}") from None
+
+        self.size = position
+        self._count = newlines + (last != b'\n')
+        self._keys = [checkpoint[0] for checkpoint in self.checkpoints]
+
+    def __len__(self):
+        return self._count
+
+    def refresh(self):
+        # Compressed archives are not expected to grow while being viewed
+        return None
+
+    def _lines_from(self, number):
+        """Yield raw lines starting with line number, from the best checkpoint."""
+        # The checkpoint must lie at or before the start of the line, which
+        # follows newline number - 1
+        index = max(0, bisect.bisect_left(self._keys, number - 1) - 1)
+        newlines, _, compressed_position, decompressor = self.checkpoints[index]
+        skip = number - 1 - newlines
+
+        carry = b''
+        for output, _, _ in self._chunks(decompressor.copy(), compressed_position):
+            data = carry + output
+            start = 0
+            if skip:
+                passed = data.count(b'\n')
+                if passed < skip:
+                    skip -= passed
+                    carry = b''
+                    continue
+            while skip:
+                found = data.find(b'\n', start)
+                if found == -1:
+                    break
+                start = found + 1
+                skip -= 1
+            if skip:
+                carry = b''
+                continue
+
+            end = data.rfind(b'\n') + 1
+            if end > start:
+                yield from data[start:end - 1].split(b'\n')
+            carry = data[max(start, end):]
+        if carry and not skip:
+            yield carry
+
+    def _cached_lines(self, first, last):
+        """Yield (number, raw line) for first to last, using the cache if any."""
+        if self.cache is None:
+            yield from zip(range(first, last + 1), self._lines_from(first))
+            return
+        sequential = self._last is not None and self._last <= first <= self._last + 1
+        self._last = last
+
+        number = first
+        while number <= last:
+            raw = self.cache.get(number)
+            if raw is not None:
+                yield number, raw
+                number += 1
+                continue
+            # One decompression run to the end of the request, or beyond
+            stop = min(len(self), last + self.readahead) if sequential else last
+            for current, raw in zip(range(number, stop + 1), self._lines_from(number)):
+                self.cache.put(current, raw)
+                if current <= last:
+                    yield current, raw
+            self.cache.misses += last - number
+            number = last + 1
+
+    def line_bytes(self, number):
+        if not 1 <= number <= len(self):
+            raise IndexError(f"line {number} is out of range 1-{len(self)}")
+        _, raw = next(self._cached_lines(number, number))
+        return strip_newline(raw + b'\n')
+
+    def line(self, number):
+        return self.line_bytes(number).decode('utf-8', errors='replace')
+
+    def iter_ranges(self, ranges):
+        """Yield (number, raw bytes) for the (first, last) ranges in file order.
+
+        Each merged range is one decompression run from the checkpoint
+        nearest its first line.
+        """
+        merged = []
+        for first, last in sorted(ranges):
+            if not 1 <= first <= last <= len(self):
+                raise IndexError(f"lines {first}-{last} are out of range 1-{len(self)}")
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+
+        for first, last in merged:
+            for number, raw in self._cached_lines(first, last):
+                yield number, strip_newline(raw + b'\n')
+
+    def search(self, pattern, flags=0):
+        """Yield (number, raw bytes) for each matching line while decompressing.
+
+        Output is searched a block of whole lines at a time, and hits are
+        yielded as soon as the block containing them has been inflated.
+        """
+        if isinstance(pattern, str):
+            pattern = pattern.encode('utf-8')
+        if isinstance(pattern, bytes):
+            pattern = re.compile(pattern, flags | re.MULTILINE)
+
+        number = 1
+        carry = b''
+        blocks = (output for output, _, _ in self._chunks(self.checkpoints[0][3].copy(), 0))
+        for output in itertools.chain(blocks, [None]):
+            if output is None:
+                block, carry = carry, b''
+            else:
+                data = carry + output
+                end = data.rfind(b'\n') + 1
+                block, carry = data[:end], data[end:]
+
+            position = 0
+            while position < len(block):
+                match = pattern.search(block, position)
+                if match is None or (match.start() == len(block) and block.endswith(b'\n')):
+                    # An empty match after the block's last newline belongs
+                    # to the next block, if any
+                    break
+                start = block.rfind(b'\n', 0, match.start()) + 1
+                number += block.count(b'\n', position, start)
+                end = block.find(b'\n', match.start())
+                end = len(block) if end == -1 else end + 1
+                yield number, strip_newline(block[start:end])
+                number += 1
+                position = end
+            number += block.count(b'\n', position)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_index(path, **options):
+    """GzipLineIndex for gzip files, LineIndex for everything else."""
+    with open(path, 'rb') as file:
+        compressed = file.read(2) == GZIP_MAGIC
+    cache_bytes = options.pop('cache_bytes', None)
+    if compressed:
+        return GzipLineIndex(path, cache_bytes=cache_bytes)
+    return LineIndex(path, cache_bytes=cache_bytes, **options)
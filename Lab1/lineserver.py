@@ -0,0 +1,316 @@
+"""
+File: lineserver.py
+
+Serves lines of large text files to many local clients at once. Each
+file is opened with open_index() the first time a client asks for it,
+and that one index (and its block cache) is then shared by every
+connection, so viewers and dashboards no longer build and page in their
+own copies.
+
+Only the files named on the command line, or files under --root, are
+served; any other path is refused. Sidecar indexes are not written
+unless --sidecar is given, and at most --max-open indexes are kept
+open, the least recently used idle one being closed first.
+
+The server listens on a Unix socket or a localhost TCP port and speaks a
+line based protocol. Requests may be pipelined: a client can send many
+of them without waiting, and the replies come back in the same order.
+
+    GET <path> <lines>   lines as in the viewer: 5, 100-200 or 5,17,9000
+    STATS                open files, client count and latency counters
+
+A reply is either 'OK <n>' followed by n lines, which for GET are
+'<number>\\t<text>', or a single 'ERR <message>' line. With --root, GET
+paths are taken relative to the root.
+
+    python lineserver.py --socket /tmp/lines.sock big.log
+    printf 'GET big.log 10-12\\nSTATS\\n' | nc -U /tmp/lines.sock
+
+Building an index and reading lines run in worker threads, so a first
+request for a huge file does not hold up other connections. Each index
+is built once, under a lock for its path, and replies are read and sent
+PIECE_LINES lines at a time; clients reading the same file take turns
+between pieces, and a file is only refreshed once no reply from it is
+in flight.
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import os
+import time
+from collections import OrderedDict
+
+from LR2_P2 import in_range, parse_query
+from lineindex import open_index
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0)
+COMMANDS = ('GET', 'STATS')
+PIECE_LINES = 4096
+
+
+class LatencyCounters:
+    """Request and error counts, total and worst latency and a histogram per command."""
+
+    def __init__(self):
+        self.commands = {}
+
+    def record(self, command, seconds, ok=True):
+        entry = self.commands.get(command)
+        if entry is None:
+            entry = self.commands[command] = {
+                'requests': 0,
+                'errors': 0,
+                'total_seconds': 0.0,
+                'max_seconds': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        entry['requests'] += 1
+        entry['errors'] += not ok
+        entry['total_seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+        entry['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def snapshot(self):
+        report = {}
+        for command, entry in self.commands.items():
+            report[command] = dict(entry, buckets=list(entry['buckets']),
+                                   mean_seconds=entry['total_seconds'] / entry['requests'])
+        return report
+
+
+def count_lines(ranges):
+    """Number of distinct lines in (first, last) ranges, as iter_ranges yields them."""
+    count = 0
+    reached = 0
+    for first, last in sorted(ranges):
+        first = max(first, reached + 1)
+        if last >= first:
+            count += last - first + 1
+            reached = last
+    return count
+
+
+def read_piece(lines, limit):
+    """Reply bytes for up to limit more (number, raw) pairs from an iterator."""
+    return b''.join(b'%d\t%s\n' % item for item in itertools.islice(lines, limit))
+
+
+class LineServer:
+    """Shared line indexes plus the request handling for every connection."""
+
+    def __init__(self, files=(), root=None, cache_bytes=64 << 20, sidecar=False, max_open=64):
+        self.files = {os.path.realpath(path) for path in files}
+        self.root = os.path.realpath(root) if root else None
+        self.cache_bytes = cache_bytes
+        self.sidecar = sidecar
+        self.max_open = max_open
+        self.indexes = OrderedDict()
+        self.clients = 0
+        self.latency = LatencyCounters()
+        self._locks = {}
+        self._busy = {}
+
+    def resolve(self, path):
+        """Real path of a file clients may read; ValueError for anything else."""
+        if self.root is not None:
+            real = os.path.realpath(os.path.join(self.root, path))
+            if os.path.commonpath([self.root, real]) == self.root:
+                return real
+        else:
+            real = os.path.realpath(path)
+        if real in self.files:
+            return real
+        raise ValueError(f"'{path}' is not served here")
+
+    def preload(self, path):
+        """Index a file before accepting clients; returns its line count."""
+        real = os.path.realpath(path)
+        self.indexes[real] = open_index(real, sidecar=self.sidecar, cache_bytes=self.cache_bytes)
+        return len(self.indexes[real])
+
+    async def _index(self, path):
+        # Called with the path's lock held, so the index is built once
+        lines = self.indexes.get(path)
+        if lines is None:
+            lines = await asyncio.to_thread(open_index, path, sidecar=self.sidecar,
+                                            cache_bytes=self.cache_bytes)
+            self.indexes[path] = lines
+            self._evict()
+        self.indexes.move_to_end(path)
+        return lines
+
+    def _evict(self):
+        """Close least recently used indexes that no request is using."""
+        for path in list(self.indexes):
+            if len(self.indexes) <= self.max_open:
+                return
+            lock = self._locks.get(path)
+            if not self._busy.get(path) and not (lock and lock.locked()):
+                self.indexes.pop(path).close()
+
+    async def get(self, path, query, write):
+        ranges = parse_query(query)
+        path = self.resolve(path)
+        lock = self._locks.setdefault(path, asyncio.Condition())
+        async with lock:
+            lines = await self._index(path)
+            if not in_range(ranges, len(lines)):
+                # The file may have grown since it was opened. Refreshing
+                # swaps the offsets and map that replies being sent are
+                # still reading, so wait until there are none.
+                await lock.wait_for(lambda: not self._busy.get(path))
+                lines = await self._index(path)
+                await asyncio.to_thread(lines.refresh)
+                if not in_range(ranges, len(lines)):
+                    raise ValueError(f"lines are numbered 1-{len(lines)}")
+            self._busy[path] = self._busy.get(path, 0) + 1
+
+        try:
+            await write(b'OK %d\n' % count_lines(ranges))
+            found = lines.iter_ranges(ranges)
+            while True:
+                async with lock:
+                    piece = await asyncio.to_thread(read_piece, found, PIECE_LINES)
+                if not piece:
+                    break
+                await write(piece)
+        finally:
+            async with lock:
+                self._busy[path] -= 1
+                lock.notify_all()
+
+    def stats(self):
+        return {
+            'files': {path: len(lines) for path, lines in self.indexes.items()},
+            'clients': self.clients,
+            'latency': self.latency.snapshot(),
+        }
+
+    async def respond(self, request, write):
+        """Answer one request line through write(); returns (command, ok).
+
+        Errors found before the reply starts are sent as ERR; anything
+        failing halfway through a reply is raised, since the client can
+        no longer tell where the reply ends.
+        """
+        command, _, rest = request.decode('utf-8', errors='replace').strip().partition(' ')
+        command = command.upper()
+        started = []
+
+        async def tracked(data):
+            started.append(True)
+            await write(data)
+
+        try:
+            if command == 'GET':
+                path, _, query = rest.strip().rpartition(' ')
+                if not path:
+                    raise ValueError("expected GET <path> <lines>")
+                await self.get(path, query, tracked)
+            elif command == 'STATS':
+                await tracked(b'OK 1\n' + json.dumps(self.stats()).encode() + b'\n')
+            else:
+                raise ValueError(f"unknown command '{command}'")
+        except (OSError, ValueError, IndexError) as e:
+            if started:
+                raise
+            message = ' '.join(str(e).split())
+            await write(f"ERR {message}\n".encode('utf-8', errors='replace'))
+            return command, False
+        return command, True
+
+    async def handle(self, reader, writer):
+        self.clients += 1
+
+        async def write(data):
+            writer.write(data)
+            await writer.drain()
+
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                start = time.perf_counter()
+                command, ok = await self.respond(request, write)
+                self.latency.record(command if command in COMMANDS else 'OTHER',
+                                    time.perf_counter() - start, ok)
+        except (OSError, ValueError, IndexError):
+            # Dropped connection, a request line longer than the stream
+            # limit, or a reply that failed halfway
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    def close(self):
+        for lines in self.indexes.values():
+            lines.close()
+        self.indexes.clear()
+
+
+async def read_reply(reader):
+    """Read one reply from the server; the list of its lines, or ValueError for ERR."""
+    status = (await reader.readline()).rstrip(b'\n')
+    if status.startswith(b'ERR '):
+        raise ValueError(status[4:].decode('utf-8', errors='replace'))
+    if not status.startswith(b'OK '):
+        raise ConnectionError("connection closed by the server")
+    return [(await reader.readline()).rstrip(b'\n') for _ in range(int(status[3:]))]
+
+
+async def serve(server, socket_path=None, host='127.0.0.1', port=8765):
+    if socket_path:
+        listener = await asyncio.start_unix_server(server.handle, socket_path)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    address = socket_path or '{}:{}'.format(*listener.sockets[0].getsockname()[:2])
+    print(f"Serving lines on {address}", flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve lines of text files to local clients.")
+    parser.add_argument('files', nargs='*', help="files to serve; they are indexed at startup")
+    parser.add_argument('--root', metavar='DIR', help="also serve any file under this directory")
+    parser.add_argument('--socket', metavar='PATH', help="listen on this Unix socket")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP address (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="TCP port (default: 8765)")
+    parser.add_argument('--cache-mb', type=float, default=64,
+                        help="block cache per file, 0 to turn it off (default: 64)")
+    parser.add_argument('--sidecar', action='store_true',
+                        help="save and reuse <file>.idx line indexes next to the files")
+    parser.add_argument('--max-open', type=int, default=64,
+                        help="most indexes kept open at once (default: 64)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.files and not args.root:
+        print("Error: name the files to serve, or a --root directory.")
+        return
+    server = LineServer(args.files, args.root, int(args.cache_mb * (1 << 20)), args.sidecar,
+                        args.max_open)
+    for path in args.files:
+        try:
+            print(f"Indexed '{path}': {server.preload(path)} lines.")
+        except OSError as e:
+            print(f"Error reading file: {e}")
+            return
+    try:
+        asyncio.run(serve(server, args.socket, args.host, args.port))
+    except KeyboardInterrupt:
+        print("Goodbye!")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,23 @@
+import bisect
+import heapq
+import math
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
 def mean(numbers):
+    array = _as_array(numbers)
+    if array is not None:
+        return _array_mean(array) if array.size else 0
+
     if not numbers:
         return 0
     
@@ -7,20 +26,193 @@ def mean(numbers):
 
 
 def median(numbers):
+    array = _as_array(numbers)
+    if array is not None:
+        return _array_median(array) if array.size else 0
+
     if not numbers:
         return 0
-    
-    sorted_numbers = sorted(numbers)
-    length = len(sorted_numbers)
+
+    return select_median(numbers, copy=True)
+
+
+def _sort_range(numbers, lo, hi):
+    for offset, number in enumerate(sorted(numbers[lo:hi + 1])):
+        numbers[lo + offset] = number
+
+
+def _partition(numbers, lo, hi):
+    """Hoare partition of numbers[lo:hi + 1] around a median-of-three pivot.
+
+    Returns (j, i) such that numbers[lo:j + 1] <= pivot, numbers[i:hi + 1]
+    >= pivot and everything in between equals the pivot.
+    """
+    a, b, c = numbers[lo], numbers[(lo + hi) // 2], numbers[hi]
+    if a > b:
+        a, b = b, a
+    if b > c:
+        b = a if a > c else c
+    pivot = b
+
+    i, j = lo, hi
+    while i <= j:
+        while numbers[i] < pivot:
+            i += 1
+        while numbers[j] > pivot:
+            j -= 1
+        if i <= j:
+            numbers[i], numbers[j] = numbers[j], numbers[i]
+            i += 1
+            j -= 1
+    return j, i
+
+
+def select(numbers, k, lo=0, hi=None):
+    """Rearrange numbers in place so numbers[k] is the k-th smallest value.
+
+    Afterwards everything in numbers[lo:k] is <= numbers[k] and everything
+    in numbers[k + 1:hi + 1] is >= it. This is quickselect with a
+    median-of-three pivot; if the partitions keep coming out lopsided the
+    remaining range is simply sorted, which bounds the worst case at
+    O(n log n) the same way introselect does.
+    """
+    if hi is None:
+        hi = len(numbers) - 1
+    budget = 4 * (hi - lo + 1).bit_length()
+
+    while hi > lo:
+        if hi - lo < 16 or budget == 0:
+            _sort_range(numbers, lo, hi)
+            return numbers[k]
+        budget -= 1
+
+        j, i = _partition(numbers, lo, hi)
+        if k <= j:
+            hi = j
+        elif k >= i:
+            lo = i
+        else:
+            return numbers[k]
+
+    return numbers[k]
+
+
+def select_many(numbers, ks):
+    """Like select(), but places several order statistics in one pass.
+
+    Each partition step splits the wanted indices between its two sides,
+    so shared work near the top of the recursion is only done once.
+    """
+    wanted = sorted(set(ks))
+    budget = 4 * max(len(numbers), 1).bit_length()
+    pending = [(0, len(numbers) - 1, wanted, budget)]
+
+    while pending:
+        lo, hi, ks, budget = pending.pop()
+        if not ks or hi <= lo:
+            continue
+        if len(ks) == 1:
+            select(numbers, ks[0], lo, hi)
+            continue
+        if hi - lo < 16 or budget == 0:
+            _sort_range(numbers, lo, hi)
+            continue
+
+        j, i = _partition(numbers, lo, hi)
+        pending.append((lo, j, [k for k in ks if k <= j], budget - 1))
+        pending.append((i, hi, [k for k in ks if k >= i], budget - 1))
+
+    return [numbers[k] for k in wanted]
+
+
+QUANTILE_METHODS = ('linear', 'lower', 'higher', 'nearest', 'midpoint')
+
+
+def quantiles(numbers, qs, method='linear'):
+    """Return the quantiles of numbers for every fraction in qs.
+
+    All the order statistics needed are found in one multi-k partition
+    pass (np.partition for buffers, select_many on a copy otherwise)
+    rather than one sort per quantile. The method decides what happens
+    when a quantile falls between two values; 'linear' and 'midpoint'
+    both give the usual even-length median for q=0.5.
+    """
+    qs = list(qs)
+    if method not in QUANTILE_METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {QUANTILE_METHODS}")
+    for q in qs:
+        if not 0 <= q <= 1:
+            raise ValueError("Quantiles must be between 0 and 1")
+
+    array = _as_array(numbers)
+    if array is None:
+        numbers = list(numbers)
+    length = len(numbers)
+    if length == 0:
+        return [0] * len(qs)
+
+    positions = []
+    for q in qs:
+        position = (length - 1) * q
+        positions.append((position, math.floor(position), math.ceil(position)))
+    ks = sorted({k for _, lower, upper in positions for k in (lower, upper)})
+
+    if array is not None:
+        partitioned = np.partition(array, ks)
+        values = {k: partitioned[k].item() for k in ks}
+    else:
+        values = dict(zip(ks, select_many(numbers, ks)))
+
+    results = []
+    for position, lower, upper in positions:
+        below, above = values[lower], values[upper]
+        fraction = position - lower
+        if lower == upper or method == 'lower':
+            results.append(below)
+        elif method == 'higher':
+            results.append(above)
+        elif method == 'nearest':
+            # Halfway ties go to the even index, as in NumPy
+            if fraction < 0.5 or (fraction == 0.5 and lower % 2 == 0):
+                results.append(below)
+            else:
+                results.append(above)
+        elif method == 'midpoint':
+            results.append((below + above) / 2)
+        else:
+            results.append(below * (1 - fraction) + above * fraction)
+    return results
+
+
+def select_median(numbers, copy=False):
+    """Median in expected O(n) time using select().
+
+    The list is reordered in place unless copy=True, in which case a
+    private copy is partitioned and the caller's data is left untouched.
+    For an even count the two middle values are averaged, like median().
+    """
+    if copy:
+        numbers = list(numbers)
+    if not numbers:
+        return 0
+
+    length = len(numbers)
     midpoint = length // 2
-    
+    upper = select(numbers, midpoint)
+
     if length % 2 == 1:
-        return sorted_numbers[midpoint]
+        return upper
     else:
-        return (sorted_numbers[midpoint - 1] + sorted_numbers[midpoint]) / 2
+        # After selecting, the lower middle value is the largest on the left
+        lower = max(numbers[i] for i in range(midpoint))
+        return (lower + upper) / 2
 
 
 def mode(numbers):
+    array = _as_array(numbers)
+    if array is not None:
+        return _array_mode(array) if array.size else 0
+
     if not numbers:
         return 0
 
@@ -38,6 +230,1038 @@ def mode(numbers):
             return number
 
 
+def _as_array(numbers):
+    """Return a NumPy view of numbers when the fast path applies, else None.
+
+    ndarrays, array.array, memoryviews and anything else exposing a
+    numeric buffer are wrapped without copying. Plain lists and tuples,
+    and everything when NumPy is not installed, use the pure Python code.
+    """
+    if np is None or isinstance(numbers, (list, tuple)):
+        return None
+    if not isinstance(numbers, np.ndarray):
+        try:
+            numbers = np.asarray(memoryview(numbers))
+        except TypeError:
+            return None
+    if numbers.dtype.kind not in 'iuf':
+        return None
+    return numbers.reshape(-1)
+
+
+def _array_mean(array):
+    # add.reduce sums floats pairwise, which keeps rounding error small
+    return float(np.add.reduce(array, dtype=np.float64) / array.size)
+
+
+def _array_median(array):
+    length = array.size
+    midpoint = length // 2
+
+    if length % 2 == 1:
+        return np.partition(array, midpoint)[midpoint].item()
+    else:
+        partitioned = np.partition(array, (midpoint - 1, midpoint))
+        return (partitioned[midpoint - 1].item() + partitioned[midpoint].item()) / 2
+
+
+def _array_mode(array):
+    kind, size = array.dtype.kind, array.dtype.itemsize
+    if kind == 'i' or (kind == 'u' and size < 8):
+        low = int(array.min())
+        span = int(array.max()) - low + 1
+    else:
+        span = None
+
+    if span is not None and span <= 4 * array.size + 1024:
+        counts = np.bincount(array.astype(np.int64) - low, minlength=span)
+        tied = np.flatnonzero(counts == counts.max()) + low
+    else:
+        values, counts = np.unique(array, return_counts=True)
+        tied = values[counts == counts.max()]
+
+    if len(tied) == 1:
+        return tied[0].item()
+    # Break ties like mode(): the value that appears first in the data
+    first = np.flatnonzero(np.isin(array, tied))[0]
+    return array[first].item()
+
+
+class RunningStats:
+    """Single-pass accumulator for count, mean, variance and mode.
+
+    Values are consumed one at a time, so any iterable or generator can be
+    fed in without building a list first. Accumulators built over separate
+    chunks can be combined with merge(). Pass track_mode=False to skip the
+    frequency counter when only the moments are needed, which keeps memory
+    constant on high-cardinality data.
+    """
+
+    def __init__(self, numbers=None, track_mode=True):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.track_mode = track_mode
+        self.frequency_count = {}
+        if numbers is not None:
+            self.update(numbers)
+
+    def push(self, number):
+        # Welford's update keeps the variance numerically stable
+        self.count += 1
+        self.total += number
+        delta = number - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (number - self._mean)
+        if self.min is None or number < self.min:
+            self.min = number
+        if self.max is None or number > self.max:
+            self.max = number
+        if self.track_mode:
+            self.frequency_count[number] = self.frequency_count.get(number, 0) + 1
+
+    def update(self, numbers):
+        array = _as_array(numbers)
+        if array is not None:
+            return self.merge(_array_running_stats(array, self.track_mode))
+
+        for number in numbers:
+            self.push(number)
+        return self
+
+    def merge(self, other):
+        """Fold another accumulator into this one and return self."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count = other.count
+            self.total = other.total
+            self.min = other.min
+            self.max = other.max
+            self._mean = other._mean
+            self._m2 = other._m2
+            if self.track_mode:
+                self.frequency_count = dict(other.frequency_count)
+            return self
+
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self.track_mode:
+            for number, frequency in other.frequency_count.items():
+                self.frequency_count[number] = self.frequency_count.get(number, 0) + frequency
+        return self
+
+    def mean(self):
+        if self.count == 0:
+            return 0
+        return self._mean
+
+    def variance(self, sample=False):
+        if self.count == 0 or (sample and self.count < 2):
+            return 0
+        if sample:
+            return self._m2 / (self.count - 1)
+        return self._m2 / self.count
+
+    def stdev(self, sample=False):
+        return self.variance(sample) ** 0.5
+
+    def mode(self):
+        if not self.track_mode:
+            raise ValueError("This accumulator was created with track_mode=False")
+        if self.count == 0:
+            return 0
+
+        max_frequency = max(self.frequency_count.values())
+        for number, frequency in self.frequency_count.items():
+            if frequency == max_frequency:
+                return number
+
+
+def _array_running_stats(array, track_mode=True):
+    partial = RunningStats(track_mode=track_mode)
+    if array.size == 0:
+        return partial
+
+    partial.count = int(array.size)
+    partial.total = array.sum().item()
+    partial.min = array.min().item()
+    partial.max = array.max().item()
+    partial._mean = _array_mean(array)
+    partial._m2 = float(np.square(array - partial._mean).sum())
+    if track_mode:
+        values, counts = np.unique(array, return_counts=True)
+        partial.frequency_count = dict(zip(values.tolist(), counts.tolist()))
+    return partial
+
+
+class QuantileSketch:
+    """Mergeable KLL sketch for approximate quantiles in bounded memory.
+
+    Items go into a stack of compactors where level h holds items of
+    weight 2**h. When a level fills up it is sorted and every other item
+    (starting at a random offset) moves up a level, so memory stays around
+    3 * k items no matter how long the stream is. Rank queries are off by
+    at most about error * count with high probability.
+
+    Sketches built in separate processes can be combined with merge(), and
+    to_dict()/from_dict() give a JSON friendly form for shipping them.
+    """
+
+    def __init__(self, error=0.01, seed=None):
+        if not 0 < error < 1:
+            raise ValueError("error must be between 0 and 1")
+
+        self.error = error
+        # KLL rank error is roughly 2.3 / k**0.97 at 99% confidence
+        self.k = max(8, math.ceil((2.296 / error) ** (1 / 0.9723)))
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.compactors = [[]]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            compactor = self.compactors[level]
+            if len(compactor) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                compactor.sort()
+                leftover = compactor.pop() if len(compactor) % 2 else None
+                offset = self._rng.randint(0, 1)
+                self.compactors[level + 1].extend(compactor[offset::2])
+                compactor.clear()
+                if leftover is not None:
+                    compactor.append(leftover)
+            level += 1
+
+    def push(self, number):
+        self.count += 1
+        if self.min is None or number < self.min:
+            self.min = number
+        if self.max is None or number > self.max:
+            self.max = number
+
+        self.compactors[0].append(number)
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def update(self, numbers):
+        for number in numbers:
+            self.push(number)
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one and return self."""
+        if other.count == 0:
+            return self
+
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+
+        self.count += other.count
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if self.count == 0:
+            return 0
+        if q == 0:
+            return self.min
+        if q == 1:
+            return self.max
+
+        weighted = sorted((number, 1 << level)
+                          for level, compactor in enumerate(self.compactors)
+                          for number in compactor)
+        # Compaction keeps the total weight equal to the count
+        target = q * self.count
+        cumulative = 0
+        for number, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return number
+        return self.max
+
+    def percentile(self, p):
+        return self.quantile(p / 100)
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def __len__(self):
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def to_dict(self):
+        return {
+            'error': self.error,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'compactors': [list(compactor) for compactor in self.compactors],
+        }
+
+    @classmethod
+    def from_dict(cls, state, seed=None):
+        sketch = cls(state['error'], seed=seed)
+        sketch.count = state['count']
+        sketch.min = state['min']
+        sketch.max = state['max']
+        sketch.compactors = [list(compactor) for compactor in state['compactors']]
+        return sketch
+
+
+class FrequencyIndex:
+    """Value counts with O(1) add, remove and mode lookup.
+
+    Values are grouped into buckets keyed by their count. One add or
+    remove moves the highest count by at most one, so the mode is always
+    found in the bucket for max_count without scanning.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.buckets = {}
+        self.max_count = 0
+
+    def _discard(self, count, value):
+        bucket = self.buckets[count]
+        del bucket[value]
+        if not bucket:
+            del self.buckets[count]
+
+    def add(self, value):
+        count = self.counts.get(value, 0)
+        if count:
+            self._discard(count, value)
+        self.counts[value] = count + 1
+        self.buckets.setdefault(count + 1, {})[value] = None
+        if count + 1 > self.max_count:
+            self.max_count = count + 1
+
+    def remove(self, value):
+        count = self.counts.get(value, 0)
+        if not count:
+            raise ValueError(f"{value!r} is not in the index")
+
+        self._discard(count, value)
+        if count == 1:
+            del self.counts[value]
+        else:
+            self.counts[value] = count - 1
+            self.buckets.setdefault(count - 1, {})[value] = None
+        if count == self.max_count and count not in self.buckets:
+            self.max_count -= 1
+
+    def mode(self):
+        if self.max_count == 0:
+            return 0
+        # Among tied values, the one that reached the top count first
+        return next(iter(self.buckets[self.max_count]))
+
+
+class RollingStats:
+    """Mean, median and mode over the last window values pushed.
+
+    The median comes from two heaps (a max-heap of the lower half and a
+    min-heap of the upper half) with lazy deletion of evicted values, and
+    the mode from a FrequencyIndex, so each push costs O(log window)
+    instead of re-sorting the window.
+    """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+
+        self.window = window
+        self.values = deque()
+        self.total = 0
+        self.frequencies = FrequencyIndex()
+        self._low = []
+        self._high = []
+        self._low_size = 0
+        self._high_size = 0
+        self._delayed = {}
+        self._evictions = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def _prune(self, heap, sign):
+        while heap and self._delayed.get(sign * heap[0]):
+            number = sign * heapq.heappop(heap)
+            self._delayed[number] -= 1
+            if not self._delayed[number]:
+                del self._delayed[number]
+
+    def _rebalance(self):
+        if self._low_size > self._high_size + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(self._low, -1)
+        elif self._low_size < self._high_size:
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+            self._high_size -= 1
+            self._low_size += 1
+            self._prune(self._high, 1)
+
+    def _evict(self):
+        number = self.values.popleft()
+        self.total -= number
+        self.frequencies.remove(number)
+
+        self._delayed[number] = self._delayed.get(number, 0) + 1
+        if self._low and number <= -self._low[0]:
+            self._low_size -= 1
+            self._prune(self._low, -1)
+        else:
+            self._high_size -= 1
+            self._prune(self._high, 1)
+        self._rebalance()
+
+        # Re-add the window from scratch now and then so float rounding in
+        # the running total cannot build up
+        self._evictions += 1
+        if self._evictions >= self.window:
+            self._evictions = 0
+            self.total = math.fsum(self.values)
+        return number
+
+    def push(self, number):
+        """Add a value, returning the one that fell out of the window or None."""
+        self.values.append(number)
+        self.total += number
+        self.frequencies.add(number)
+
+        if not self._low or number <= -self._low[0]:
+            heapq.heappush(self._low, -number)
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, number)
+            self._high_size += 1
+        self._rebalance()
+
+        if len(self.values) > self.window:
+            return self._evict()
+        return None
+
+    def update(self, numbers):
+        for number in numbers:
+            self.push(number)
+        return self
+
+    def mean(self):
+        if not self.values:
+            return 0
+        return self.total / len(self.values)
+
+    def median(self):
+        if not self.values:
+            return 0
+        if self._low_size > self._high_size:
+            return -self._low[0]
+        return (-self._low[0] + self._high[0]) / 2
+
+    def mode(self):
+        return self.frequencies.mode()
+
+
+class StatsSet:
+    """Mutable sorted multiset that answers mean, median and mode quickly.
+
+    Values are kept sorted in blocks of at most 2 * load items. bisect
+    over the block maxima finds the block for a value, and a Fenwick tree
+    over the block lengths finds the k-th value, so add() and remove() are
+    O(log n) plus a short list shift, median() is O(log n) and mean() and
+    mode() are O(1) via a running total and a FrequencyIndex.
+    """
+
+    load = 512
+
+    def __init__(self, numbers=()):
+        ordered = sorted(numbers)
+        self._blocks = [ordered[start:start + self.load]
+                        for start in range(0, len(ordered), self.load)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._build_tree()
+        self._length = len(ordered)
+        self.total = sum(ordered)
+        self.frequencies = FrequencyIndex()
+        for number in ordered:
+            self.frequencies.add(number)
+
+    def _build_tree(self):
+        tree = [0] + [len(block) for block in self._blocks]
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    def _tree_add(self, block, delta):
+        index = block + 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def _locate(self, k):
+        """(block, offset) of the k-th smallest value."""
+        block = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            following = block + step
+            if following < len(self._tree) and self._tree[following] <= k:
+                block = following
+                k -= self._tree[following]
+            step >>= 1
+        return block, k
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    def __contains__(self, number):
+        return number in self.frequencies.counts
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += self._length
+        if not 0 <= k < self._length:
+            raise IndexError("StatsSet index out of range")
+        block, offset = self._locate(k)
+        return self._blocks[block][offset]
+
+    def add(self, number):
+        self._length += 1
+        self.total += number
+        self.frequencies.add(number)
+
+        if not self._blocks:
+            self._blocks.append([number])
+            self._maxes.append(number)
+            self._build_tree()
+            return
+
+        index = bisect.bisect_left(self._maxes, number)
+        if index == len(self._maxes):
+            index -= 1
+        block = self._blocks[index]
+        bisect.insort(block, number)
+        self._maxes[index] = block[-1]
+
+        if len(block) > 2 * self.load:
+            self._blocks[index:index + 1] = [block[:self.load], block[self.load:]]
+            self._maxes[index:index + 1] = [block[self.load - 1], block[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(index, 1)
+
+    def remove(self, number):
+        if number not in self.frequencies.counts:
+            raise ValueError(f"{number!r} is not in the set")
+
+        index = bisect.bisect_left(self._maxes, number)
+        block = self._blocks[index]
+        del block[bisect.bisect_left(block, number)]
+        self._length -= 1
+        self.total -= number
+        self.frequencies.remove(number)
+
+        if block:
+            self._maxes[index] = block[-1]
+            self._tree_add(index, -1)
+        else:
+            del self._blocks[index]
+            del self._maxes[index]
+            self._build_tree()
+
+    def mean(self):
+        if not self._length:
+            return 0
+        return self.total / self._length
+
+    def median(self):
+        if not self._length:
+            return 0
+
+        midpoint = self._length // 2
+        if self._length % 2 == 1:
+            return self[midpoint]
+        else:
+            return (self[midpoint - 1] + self[midpoint]) / 2
+
+    def mode(self):
+        return self.frequencies.mode()
+
+
+class HeavyHitters:
+    """Space-Saving estimate of the most frequent values in fixed memory.
+
+    At most k values are tracked. When an untracked value arrives with the
+    table full it takes over the slot of the value with the smallest
+    count, inheriting that count as its error. Estimates are never low and
+    at most count / k too high, and any value seen more than count / k
+    times is guaranteed to be in the table.
+    """
+
+    def __init__(self, k=100):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+
+        self.k = k
+        self.count = 0
+        self.counters = {}
+        self._heap = []
+        self._sequence = 0
+
+    def _track(self, value, count):
+        # Heap entries go stale when a count changes; _pop_min skips them
+        self._sequence += 1
+        heapq.heappush(self._heap, (count, self._sequence, value))
+
+    def _rebuild_heap(self):
+        self._heap = []
+        for value, (count, _) in self.counters.items():
+            self._track(value, count)
+
+    def _pop_min(self):
+        while True:
+            count, _, value = heapq.heappop(self._heap)
+            counter = self.counters.get(value)
+            if counter is not None and counter[0] == count:
+                return value, count
+
+    def push(self, value):
+        self.count += 1
+        counter = self.counters.get(value)
+        if counter is not None:
+            counter[0] += 1
+            self._track(value, counter[0])
+        elif len(self.counters) < self.k:
+            self.counters[value] = [1, 0]
+            self._track(value, 1)
+        else:
+            victim, smallest = self._pop_min()
+            del self.counters[victim]
+            self.counters[value] = [smallest + 1, smallest]
+            self._track(value, smallest + 1)
+
+        if len(self._heap) > 4 * self.k:
+            self._rebuild_heap()
+
+    def update(self, values):
+        for value in values:
+            self.push(value)
+        return self
+
+    def _floor(self):
+        if len(self.counters) < self.k:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other):
+        """Fold another summary into this one and return self.
+
+        A value missing from a full table may still have occurred up to
+        that table's smallest count, so that is added to both its
+        estimate and its error before the k largest are kept.
+        """
+        floor, other_floor = self._floor(), other._floor()
+        merged = {}
+        for value in set(self.counters) | set(other.counters):
+            count, error = self.counters.get(value, (floor, floor))
+            other_count, other_error = other.counters.get(value, (other_floor, other_floor))
+            merged[value] = [count + other_count, error + other_error]
+
+        kept = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)[:self.k]
+        self.counters = dict(kept)
+        self.count += other.count
+        self._rebuild_heap()
+        return self
+
+    @property
+    def error_bound(self):
+        return self.count / self.k
+
+    def top(self, n=None):
+        """(value, estimated count, maximum overestimate), most frequent first."""
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)
+        return [(value, count, error) for value, (count, error) in ranked[:n]]
+
+    def mode(self):
+        if not self.counters:
+            return 0
+        return self.top(1)[0][0]
+
+    def exact_mode(self, values):
+        """Recount the tracked candidates exactly over a second pass of values.
+
+        This is exact whenever the true mode occurs more than count / k
+        times, since such a value is always among the candidates.
+        """
+        if not self.counters:
+            return 0
+
+        exact = dict.fromkeys(self.counters, 0)
+        for value in values:
+            if value in exact:
+                exact[value] += 1
+        return max(exact.items(), key=lambda item: item[1])[0]
+
+
+def _chunk_values(chunk):
+    # Chunks may be lazy references (see filestats.FileChunk) that are only
+    # resolved inside the worker process
+    load = getattr(chunk, 'load', None)
+    return load() if load is not None else chunk
+
+
+def _chunk_moments(chunk):
+    return RunningStats(_chunk_values(chunk), track_mode=False)
+
+
+def _bin_width(low, high, bins):
+    """Width of one of bins equal bins over [low, high]; an exact int for int bounds."""
+    if isinstance(low, int) and isinstance(high, int):
+        return -(-(high - low + 1) // bins)
+    return (high - low) / bins
+
+
+def _chunk_histogram(chunk, low, high, bins):
+    """Count values below low and in each equal-width bin over [low, high].
+
+    With int bounds the bins are whole numbers wide and values are binned
+    with integer arithmetic, so int64 data above 2**53 is not rounded.
+    """
+    chunk = _chunk_values(chunk)
+    width = _bin_width(low, high, bins)
+    array = _as_array(chunk)
+    if array is not None:
+        inside = array[(array >= low) & (array <= high)]
+        if isinstance(width, int) and array.dtype.kind in 'iu':
+            # value - low can exceed int64, but always fits in uint64
+            offsets = inside.astype(np.int64).view(np.uint64) - np.uint64(low % (1 << 64))
+            index = (offsets // np.uint64(width)).astype(np.int64)
+        else:
+            index = np.minimum(((inside - low) // width).astype(np.int64), bins - 1)
+        counts = np.bincount(index, minlength=bins)
+        return int(np.count_nonzero(array < low)), counts.tolist()
+
+    below = 0
+    counts = [0] * bins
+    for number in chunk:
+        if number < low:
+            below += 1
+        elif number <= high:
+            counts[min(int((number - low) // width), bins - 1)] += 1
+    return below, counts
+
+
+def _chunk_between(chunk, low, high):
+    """Number of values below low and the counts of each value in [low, high]."""
+    chunk = _chunk_values(chunk)
+    array = _as_array(chunk)
+    if array is not None:
+        values, counts = np.unique(array[(array >= low) & (array <= high)], return_counts=True)
+        return int(np.count_nonzero(array < low)), dict(zip(values.tolist(), counts.tolist()))
+
+    below = 0
+    frequency_count = {}
+    for number in chunk:
+        if number < low:
+            below += 1
+        elif number <= high:
+            frequency_count[number] = frequency_count.get(number, 0) + 1
+    return below, frequency_count
+
+
+def _chunk_counts(chunk, part, parts):
+    """Frequency counts for the values of chunk in hash partition part."""
+    chunk = _chunk_values(chunk)
+    array = _as_array(chunk)
+    if array is not None:
+        values, counts = np.unique(array, return_counts=True)
+        if parts > 1:
+            keep = [hash(value) % parts == part for value in values.tolist()]
+            values, counts = values[keep], counts[keep]
+        return dict(zip(values.tolist(), counts.tolist()))
+
+    frequency_count = {}
+    for number in chunk:
+        if parts == 1 or hash(number) % parts == part:
+            frequency_count[number] = frequency_count.get(number, 0) + 1
+    return frequency_count
+
+
+def _chunked_select(chunks, ranks, low, high, mapper, bins, limit):
+    """The values at the two ranks (possibly equal) of the data in chunks."""
+    integral = isinstance(low, int) and isinstance(high, int)
+    while low != high:
+        width = _bin_width(low, high, bins)
+        if not width or (integral and high - low < bins):
+            break
+        histograms = mapper(partial(_chunk_histogram, low=low, high=high, bins=bins), chunks)
+        below = 0
+        counts = [0] * bins
+        for chunk_below, chunk_counts in histograms:
+            below += chunk_below
+            counts = [a + b for a, b in zip(counts, chunk_counts)]
+
+        if sum(counts) <= limit:
+            break
+
+        # Find the bins holding the lower and upper ranks
+        seen = below
+        edges = []
+        for index, bin_count in enumerate(counts):
+            while len(edges) < 2 and ranks[len(edges)] < seen + bin_count:
+                edges.append(index)
+            seen += bin_count
+
+        if integral:
+            new_low = low + edges[0] * width
+            new_high = min(high, low + (edges[1] + 1) * width - 1)
+        else:
+            # Keep a spare bin on each side so rounding at the edges cannot
+            # push a wanted value out of range
+            new_low, new_high = low, high
+            if edges[1] + 2 < bins:
+                new_high = low + (edges[1] + 2) * width
+            if edges[0] > 0:
+                new_low = low + (edges[0] - 1) * width
+        if (new_low, new_high) == (low, high):
+            if ranks[0] != ranks[1]:
+                # The two values sit at opposite ends of the range, so
+                # narrow towards each of them on its own
+                return [_chunked_select(chunks, (rank, rank), low, high, mapper, bins, limit)[0]
+                        for rank in ranks]
+            # Only a few representable floats are left in range
+            break
+        low, high = new_low, new_high
+
+    if low == high:
+        return [low, low]
+
+    # Count the distinct values left in range and walk them in order
+    below = 0
+    frequency_count = {}
+    for chunk_below, chunk_counts in mapper(partial(_chunk_between, low=low, high=high), chunks):
+        below += chunk_below
+        for number, frequency in chunk_counts.items():
+            frequency_count[number] = frequency_count.get(number, 0) + frequency
+
+    picked = []
+    seen = below
+    for number in sorted(frequency_count):
+        seen += frequency_count[number]
+        while len(picked) < 2 and ranks[len(picked)] < seen:
+            picked.append(number)
+    return picked
+
+
+def chunked_median(chunks, count, low, high, mapper=map, bins=4096, limit=1 << 20):
+    """Exact median of values spread over chunks, without loading them all.
+
+    Each pass histograms the current [low, high] range over every chunk and
+    narrows it to the bins holding the middle rank(s). Once at most limit
+    values are left in range (or fewer than bins integers, or only a few
+    floats) the distinct values in range are counted and the middle ones
+    picked from the counts, so memory stays at one histogram plus those
+    counts. Int bounds, as int64 data gives, are narrowed with exact
+    integer arithmetic so values above 2**53 are not rounded. count, low
+    and high come from a first pass such as chunked_stats() does; mapper
+    can be swapped for a pool's map to run the passes in parallel.
+    """
+    if count == 0:
+        return 0
+
+    ranks = ((count - 1) // 2, count // 2)
+    first, second = _chunked_select(chunks, ranks, low, high, mapper, bins, limit)
+    if first == second:
+        return first
+    if isinstance(first, int) and isinstance(second, int) and (first + second) % 2 == 0:
+        return (first + second) // 2
+    return (first + second) / 2
+
+
+def chunked_mode(chunks, mapper=map, max_distinct=1 << 20):
+    """Exact mode of values spread over chunks with a bounded counter.
+
+    Counting starts with one partition; if the merged counter grows past
+    max_distinct entries it is dropped and the values are recounted split
+    into twice as many hash partitions, one partition per pass.
+    """
+    parts = 1
+    while True:
+        best = None
+        overflow = False
+        for part in range(parts):
+            frequency_count = {}
+            for chunk_counts in mapper(partial(_chunk_counts, part=part, parts=parts), chunks):
+                for number, frequency in chunk_counts.items():
+                    frequency_count[number] = frequency_count.get(number, 0) + frequency
+                if len(frequency_count) > max_distinct:
+                    overflow = True
+                    break
+            if overflow:
+                break
+            if frequency_count:
+                number, frequency = max(frequency_count.items(), key=lambda item: item[1])
+                if best is None or frequency > best[1]:
+                    best = (number, frequency)
+        if not overflow:
+            return best[0] if best else 0
+        parts *= 2
+
+
+def chunked_stats(chunks, mapper=map, max_distinct=1 << 20):
+    """Count, mean, variance, median and mode over a list of chunks.
+
+    Chunks are sequences or buffers (slices of a memory-mapped file, say)
+    and each pass touches one chunk at a time, so peak memory does not
+    depend on the total size of the data.
+    """
+    moments = RunningStats(track_mode=False)
+    for partial_stats in mapper(_chunk_moments, chunks):
+        moments.merge(partial_stats)
+
+    return {
+        'count': moments.count,
+        'mean': moments.mean(),
+        'variance': moments.variance(),
+        'min': moments.min,
+        'max': moments.max,
+        'median': chunked_median(chunks, moments.count, moments.min, moments.max, mapper),
+        'mode': chunked_mode(chunks, mapper, max_distinct),
+    }
+
+
+def split_chunks(numbers, parts):
+    """Cut a sequence into at most parts contiguous slices of similar size."""
+    size = max(1, -(-len(numbers) // parts))
+    return [numbers[start:start + size] for start in range(0, len(numbers), size)]
+
+
+def parallel_stats(numbers, workers=None, max_distinct=1 << 20):
+    """chunked_stats() with every pass spread over a process pool.
+
+    Each worker reduces its slice to a compact partial result (moments,
+    a histogram or a frequency counter) and only those are merged in this
+    process. Slices are pickled to the workers on each pass, so for data
+    that already lives in a file prefer filestats.file_stats(workers=...),
+    where workers map the file themselves.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool:
+        return chunked_stats(split_chunks(numbers, workers * 4), pool.map, max_distinct)
+
+
+def group_stats(keys, values=None):
+    """Count, mean, median and mode for every key, in one aggregation pass.
+
+    Takes either an iterable of (key, value) pairs, or parallel keys and
+    values columns. Plain input is bucketed by key in a single hash pass
+    and each bucket summarised once. When both columns are NumPy arrays
+    (values numeric), the rows are sorted by key and value together and
+    every group is summarised from its slice with reduceat, without a
+    Python loop over rows; there ties for the mode go to the smallest value
+    rather than the first seen.
+    """
+    if values is not None and np is not None and isinstance(keys, np.ndarray):
+        array = _as_array(values)
+        if array is not None:
+            return _array_group_stats(keys.reshape(-1), array)
+
+    pairs = zip(keys, values) if values is not None else keys
+    groups = {}
+    for key, value in pairs:
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [value]
+        else:
+            group.append(value)
+
+    result = {}
+    for key, group in groups.items():
+        result[key] = {
+            'count': len(group),
+            'mean': mean(group),
+            'mode': mode(group),
+            # Last, since it reorders the bucket in place
+            'median': select_median(group),
+        }
+    return result
+
+
+def _array_group_stats(keys, values):
+    if len(keys) != len(values):
+        raise ValueError("keys and values must be the same length")
+    if len(keys) == 0:
+        return {}
+
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    length = len(keys)
+
+    new_key = np.empty(length, dtype=bool)
+    new_key[0] = True
+    new_key[1:] = keys[1:] != keys[:-1]
+    starts = np.flatnonzero(new_key)
+    counts = np.diff(np.append(starts, length))
+    means = np.add.reduceat(values.astype(np.float64), starts) / counts
+    lower = values[starts + (counts - 1) // 2].tolist()
+    upper = values[starts + counts // 2].tolist()
+
+    # Runs of equal values inside each group; the longest run is the mode
+    new_run = new_key.copy()
+    new_run[1:] |= values[1:] != values[:-1]
+    runs = np.flatnonzero(new_run)
+    run_lengths = np.diff(np.append(runs, length))
+    run_groups = np.searchsorted(starts, runs, side='right') - 1
+    longest = np.maximum.reduceat(run_lengths, np.searchsorted(runs, starts))
+    winners = np.flatnonzero(run_lengths == longest[run_groups])
+    _, first = np.unique(run_groups[winners], return_index=True)
+    modes = values[runs[winners[first]]].tolist()
+
+    result = {}
+    for index, key in enumerate(keys[starts].tolist()):
+        count = int(counts[index])
+        result[key] = {
+            'count': count,
+            'mean': float(means[index]),
+            'mode': modes[index],
+            'median': lower[index] if count % 2 else (lower[index] + upper[index]) / 2,
+        }
+    return result
+
+
 def main():
     test_numbers = [1, 2, 3, 3, 4, 5, 6]
     
@@ -0,0 +1,244 @@
+import gzip
+import itertools
+import os
+import tempfile
+import unittest
+from unittest import mock
+import lineindex
+from lineindex import (BlockCache, GzipLineIndex, LineIndex, LRUCache, build_offsets,
+                       open_index, scan_newlines, sidecar_path)
+
+
+class TestLineIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'log.txt')
+        self.write(b'alpha\r\nbeta\n\ngamma')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, data, mode='wb'):
+        with open(self.path, mode) as file:
+            file.write(data)
+
+    def test_lines(self):
+        with LineIndex(self.path) as lines:
+            self.assertEqual(len(lines), 4)
+            self.assertEqual(lines.line(1), 'alpha')
+            self.assertEqual(lines.line(3), '')
+            self.assertEqual(lines.line(4), 'gamma')
+            with self.assertRaises(IndexError):
+                lines.line(5)
+        # Nothing is written next to the file unless asked for
+        self.assertFalse(os.path.exists(sidecar_path(self.path)))
+
+    def test_matches_readlines(self):
+        self.write(b'one\ntwo\n')
+        with open(self.path) as file:
+            expected = [line.rstrip('\n') for line in file.readlines()]
+        with LineIndex(self.path, sidecar=False) as lines:
+            self.assertEqual([lines.line(n) for n in range(1, len(lines) + 1)], expected)
+
+    def test_iter_ranges(self):
+        self.write(b''.join(b'row %d\r\n' % n for n in range(1, 101)))
+        with LineIndex(self.path, sidecar=False) as lines:
+            found = list(lines.iter_ranges([(90, 92), (5, 5), (3, 6), (100, 100)], max_span=16))
+            self.assertEqual([number for number, _ in found], [3, 4, 5, 6, 90, 91, 92, 100])
+            self.assertEqual(found[-1][1], b'row 100')
+            with self.assertRaises(IndexError):
+                list(lines.iter_ranges([(99, 101)]))
+
+    def test_search(self):
+        self.write(b'error one\nok\nerror two error\n\nlast error')
+        with LineIndex(self.path, sidecar=False) as lines:
+            self.assertEqual([number for number, _ in lines.search('error')], [1, 3, 5])
+            self.assertEqual(list(lines.search(r'^ok$')), [(2, b'ok')])
+            self.assertEqual(next(lines.search('two')), (3, b'error two error'))
+            self.assertEqual(list(lines.search('missing')), [])
+
+        self.write(b'a\n\nb\n')
+        with LineIndex(self.path) as lines:
+            self.assertEqual(list(lines.search(r'^$')), [(2, b'')])
+            self.assertEqual([number for number, _ in lines.search(b'x*')], [1, 2, 3])
+        self.write(b'a\nb')
+        with LineIndex(self.path) as lines:
+            self.assertEqual(list(lines.search(r'b$')), [(2, b'b')])
+            self.assertEqual(list(lines.search(r'^$')), [])
+
+    def test_empty_file(self):
+        self.write(b'')
+        with LineIndex(self.path) as lines:
+            self.assertEqual(len(lines), 0)
+
+    def test_sidecar_reused_until_file_changes(self):
+        LineIndex(self.path, sidecar=True).close()
+        self.assertTrue(os.path.exists(sidecar_path(self.path)))
+        with LineIndex(self.path, sidecar=True) as lines:
+            self.assertIsInstance(lines.offsets, memoryview)
+            self.assertEqual(lines.line(2), 'beta')
+
+        self.write(b'\nextra\n', mode='ab')
+        with LineIndex(self.path, sidecar=True) as lines:
+            self.assertNotIsInstance(lines.offsets, memoryview)
+            self.assertEqual(len(lines), 5)
+            self.assertEqual(lines.line(5), 'extra')
+
+    def test_refresh_growth(self):
+        with LineIndex(self.path, sidecar=True) as lines:
+            self.assertIsNone(lines.refresh())
+            self.write(b'-continued\nnew\n', mode='ab')
+            self.assertEqual(lines.refresh(), 'grown')
+            self.assertEqual(len(lines), 5)
+            self.assertEqual(lines.line(4), 'gamma-continued')
+            self.assertEqual(lines.line(5), 'new')
+        # The sidecar written on close matches the grown file
+        with LineIndex(self.path, sidecar=True) as lines:
+            self.assertIsInstance(lines.offsets, memoryview)
+            self.assertEqual(len(lines), 5)
+
+    def test_refresh_growth_from_sidecar(self):
+        LineIndex(self.path, sidecar=True).close()
+        with LineIndex(self.path, sidecar=True) as lines:
+            self.assertIsInstance(lines.offsets, memoryview)
+            self.write(b'\nnew\n', mode='ab')
+            self.assertEqual(lines.refresh(), 'grown')
+            self.assertEqual([lines.line(n) for n in range(1, 6)],
+                             ['alpha', 'beta', '', 'gamma', 'new'])
+        with LineIndex(self.path, sidecar=True) as lines:
+            self.assertEqual(len(lines), 5)
+
+    def test_refresh_truncation_and_rotation(self):
+        with LineIndex(self.path) as lines:
+            self.write(b'short\n')
+            self.assertEqual(lines.refresh(), 'rebuilt')
+            self.assertEqual(len(lines), 1)
+
+            replacement = self.path + '.new'
+            with open(replacement, 'wb') as file:
+                file.write(b'rotated\nfile\nhere\n')
+            os.replace(replacement, self.path)
+            self.assertEqual(lines.refresh(), 'rebuilt')
+            self.assertEqual(lines.line(3), 'here')
+
+    def test_parallel_build(self):
+        data = b''.join(b'line %d\n' % n for n in range(5000)) + b'last'
+        self.write(data)
+        minimum = lineindex.MIN_RANGE
+        lineindex.MIN_RANGE = 1000
+        try:
+            offsets = build_offsets(self.path, len(data), workers=2)
+        finally:
+            lineindex.MIN_RANGE = minimum
+        self.assertEqual(offsets, scan_newlines(data))
+
+        with LineIndex(self.path, sidecar=False, workers=2) as lines:
+            self.assertEqual(len(lines), 5001)
+            self.assertEqual(lines.line(4000), 'line 3999')
+            self.assertEqual(lines.line(5001), 'last')
+
+    def test_block_cache(self):
+        data = b''.join(b'row %d\n' % n for n in range(1, 2001))
+        self.write(data)
+        with LineIndex(self.path, sidecar=False, cache_bytes=4096) as lines:
+            cache = lines.cache = BlockCache(lines._file, 4096, block_size=256, readahead=2)
+            self.assertEqual(lines.line(1500), 'row 1500')
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+            self.assertEqual(lines.line(1500), 'row 1500')
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            # Paging forward is served by the read-ahead
+            self.assertEqual([raw for _, raw in lines.iter_ranges([(1501, 1530)])],
+                             [b'row %d' % n for n in range(1501, 1531)])
+            self.assertEqual(cache.misses, 1)
+            self.assertLessEqual(cache.used, 4096)
+            self.assertEqual(cache.read(0, len(data)), data)
+            self.assertLessEqual(cache.used, 4096)
+
+            self.write(b'row 2001\n', mode='ab')
+            lines.refresh()
+            self.assertEqual(lines.line(2001), 'row 2001')
+
+    def test_lru_cache_charges_per_entry(self):
+        cache = LRUCache(100 * lineindex.CACHE_ENTRY_OVERHEAD)
+        for number in range(1000):
+            cache.put(number, b'')
+        # Empty values still cost their overhead, so old ones are evicted
+        self.assertEqual(len(cache), 100)
+        self.assertIsNone(cache.get(0))
+        self.assertEqual(cache.get(999), b'')
+
+    def test_scan_newlines(self):
+        self.assertEqual(list(scan_newlines(b'a\nbb\n\nc')), [2, 5, 6])
+        self.assertEqual(list(scan_newlines(b'a\nbb\n\nc', 3)), [5, 6])
+
+
+class TestGzipLineIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'log.txt.gz')
+        self.lines = [b'entry %d %s' % (n, b'x' * (n % 37)) for n in range(1, 3001)]
+        data = b'\n'.join(self.lines) + b'\n'
+        # Two gzip members, the way concatenated archives look
+        with open(self.path, 'wb') as file:
+            file.write(gzip.compress(data[:20000]) + gzip.compress(data[20000:]))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lines_from_checkpoints(self):
+        with GzipLineIndex(self.path, spacing=4096) as lines:
+            self.assertEqual(len(lines), 3000)
+            self.assertGreater(len(lines.checkpoints), 1)
+            for number in (1, 2, 700, 1500, 2999, 3000):
+                self.assertEqual(lines.line_bytes(number), self.lines[number - 1])
+            with self.assertRaises(IndexError):
+                lines.line(3001)
+
+    def test_ranges_and_search(self):
+        with GzipLineIndex(self.path, spacing=4096) as lines:
+            found = list(lines.iter_ranges([(1200, 1202), (5, 5)]))
+            self.assertEqual([number for number, _ in found], [5, 1200, 1201, 1202])
+            self.assertEqual(found[1][1], self.lines[1199])
+            hits = [number for number, _ in lines.search(rb'^entry 2\d\d\d x{36}$')]
+            self.assertEqual(hits, [n for n in range(2000, 3000) if n % 37 == 36])
+            # The file ends with a newline, so there is no empty line after it
+            self.assertEqual(list(lines.search(rb'^$')), [])
+            self.assertEqual(len(list(lines.search(rb'x*'))), 3000)
+
+    def test_interleaved_readers(self):
+        # Two generators taking turns on the shared file, as server clients do
+        with GzipLineIndex(self.path, spacing=4096) as lines, \
+                mock.patch.object(lineindex, 'READ_BLOCK', 256):
+            readers = [lines.iter_ranges([(1, 2000)]), lines.iter_ranges([(1500, 3000)])]
+            found = [[], []]
+            while any(readers):
+                for number, reader in enumerate(readers):
+                    if reader:
+                        piece = [raw for _, raw in itertools.islice(reader, 50)]
+                        found[number].extend(piece)
+                        if not piece:
+                            readers[number] = None
+            self.assertEqual(found, [self.lines[:2000], self.lines[1499:]])
+
+    def test_line_cache(self):
+        with GzipLineIndex(self.path, spacing=4096, cache_bytes=1 << 20, readahead=10) as lines:
+            self.assertEqual(lines.line_bytes(1000), self.lines[999])
+            self.assertEqual(lines.line_bytes(1000), self.lines[999])
+            self.assertEqual((lines.cache.hits, lines.cache.misses), (1, 1))
+            found = [raw for _, raw in lines.iter_ranges([(1001, 1005)])]
+            self.assertEqual(found, self.lines[1000:1005])
+            self.assertEqual(lines.cache.misses, 6)
+            # The read-ahead already inflated the next few lines
+            self.assertEqual(lines.line_bytes(1010), self.lines[1009])
+            self.assertEqual(lines.cache.misses, 6)
+
+    def test_open_index(self):
+        with open_index(self.path, cache_bytes=1 << 20) as lines:
+            self.assertIsInstance(lines, GzipLineIndex)
+            self.assertIsNotNone(lines.cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
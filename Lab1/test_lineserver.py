@@ -0,0 +1,192 @@
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import lineindex
+import lineserver
+from lineindex import LineIndex
+from lineserver import LineServer, read_reply
+
+
+class TestLineServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'log.txt')
+        with open(self.path, 'wb') as file:
+            file.write(b''.join(b'row %d\n' % n for n in range(1, 101)))
+        self.server = LineServer([self.path], cache_bytes=1 << 16)
+        self.listener = await asyncio.start_server(self.server.handle, '127.0.0.1', 0)
+        self.port = self.listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.listener.close()
+        await self.listener.wait_closed()
+        self.server.close()
+        self.directory.cleanup()
+
+    async def connect(self):
+        return await asyncio.open_connection('127.0.0.1', self.port)
+
+    async def test_pipelined_requests(self):
+        reader, writer = await self.connect()
+        writer.write(f"GET {self.path} 5\nGET {self.path} 98-101\nGET {self.path} 99,2\n".encode())
+        await writer.drain()
+        self.assertEqual(await read_reply(reader), [b'5\trow 5'])
+        with self.assertRaises(ValueError):
+            await read_reply(reader)
+        self.assertEqual(await read_reply(reader), [b'2\trow 2', b'99\trow 99'])
+        writer.close()
+        await writer.wait_closed()
+
+    async def test_clients_share_one_index(self):
+        first, first_writer = await self.connect()
+        second, second_writer = await self.connect()
+        first_writer.write(f"GET {self.path} 1\n".encode())
+        second_writer.write(f"GET {self.path} 100\nSTATS\n".encode())
+        self.assertEqual(await read_reply(first), [b'1\trow 1'])
+        self.assertEqual(await read_reply(second), [b'100\trow 100'])
+        (report,) = await read_reply(second)
+        report = json.loads(report)
+        self.assertEqual(list(report['files'].values()), [100])
+        self.assertEqual(report['clients'], 2)
+        self.assertEqual(report['latency']['GET']['requests'], 2)
+        self.assertEqual(sum(report['latency']['GET']['buckets']), 2)
+        for writer in (first_writer, second_writer):
+            writer.close()
+            await writer.wait_closed()
+
+    async def request(self, text):
+        reader, writer = await self.connect()
+        writer.write(text.encode())
+        try:
+            return await read_reply(reader)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def test_errors(self):
+        with self.assertRaisesRegex(ValueError, 'not served'):
+            await self.request("GET missing.txt 1\n")
+        with self.assertRaises(ValueError):
+            await self.request(f"GET {self.path} x\n")
+        with self.assertRaisesRegex(ValueError, "unknown command 'HELLO'"):
+            await self.request("HELLO\n")
+
+    async def test_only_listed_files_are_served(self):
+        other = os.path.join(self.directory.name, 'other.txt')
+        with open(other, 'wb') as file:
+            file.write(b'secret\n')
+        for path in (other, os.path.join(self.directory.name, '..', os.path.basename(
+                self.directory.name), 'other.txt'), __file__):
+            with self.assertRaisesRegex(ValueError, 'not served'):
+                await self.request(f"GET {path} 1\n")
+        self.assertEqual(await self.request(f"GET {self.path} 3\n"), [b'3\trow 3'])
+        self.assertFalse(os.path.exists(self.path + '.idx'))
+
+    async def test_root(self):
+        self.server.close()
+        self.server.root = os.path.realpath(self.directory.name)
+        self.server.files = set()
+        self.assertEqual(await self.request("GET log.txt 7\n"), [b'7\trow 7'])
+        with self.assertRaisesRegex(ValueError, 'not served'):
+            await self.request("GET ../log.txt 1\n")
+        with self.assertRaisesRegex(ValueError, 'not served'):
+            await self.request(f"GET {__file__} 1\n")
+
+    async def test_slow_index_does_not_block_others(self):
+        release = threading.Event()
+        calls = []
+
+        def slow_open(path, **options):
+            calls.append(path)
+            release.wait(5)
+            return open_index(path, **options)
+
+        open_index = lineserver.open_index
+        with mock.patch.object(lineserver, 'open_index', slow_open):
+            first = asyncio.ensure_future(self.request(f"GET {self.path} 1\n"))
+            second = asyncio.ensure_future(self.request(f"GET {self.path} 2\n"))
+            (report,) = await asyncio.wait_for(self.request("STATS\n"), 5)
+            self.assertEqual(json.loads(report)['files'], {})
+            release.set()
+            self.assertEqual(await first, [b'1\trow 1'])
+            self.assertEqual(await second, [b'2\trow 2'])
+        self.assertEqual(len(calls), 1)
+
+    async def test_large_reply_in_pieces(self):
+        pieces = []
+        read_piece = lineserver.read_piece
+
+        def counted(lines, limit):
+            pieces.append(read_piece(lines, limit))
+            return pieces[-1]
+
+        with mock.patch.object(lineserver, 'PIECE_LINES', 7), \
+                mock.patch.object(lineserver, 'read_piece', counted):
+            lines = await self.request(f"GET {self.path} 90-100,1-20,15-30\n")
+        self.assertEqual(lines, [b'%d\trow %d' % (n, n) for n in [*range(1, 31), *range(90, 101)]])
+        self.assertEqual([piece.count(b'\n') for piece in pieces], [7] * 5 + [6, 0])
+
+    async def test_clients_share_a_gzip_file(self):
+        path = os.path.join(self.directory.name, 'log.gz')
+        rows = [b'row %d %s' % (n, b'%x' % (n * 2654435761 % 1000003) * 3) for n in range(1, 20001)]
+        with gzip.open(path, 'wb') as file:
+            file.write(b'\n'.join(rows) + b'\n')
+        self.server.files.add(os.path.realpath(path))
+        with mock.patch.object(lineserver, 'PIECE_LINES', 100), \
+                mock.patch.object(lineindex, 'READ_BLOCK', 512):
+            first, second = await asyncio.gather(self.request(f"GET {path} 1-15000\n"),
+                                                 self.request(f"GET {path} 5000-20000\n"))
+        # Joined, since a failing diff of lists this long takes minutes
+        self.assertEqual(b'\n'.join(first),
+                         b'\n'.join(b'%d\t%s' % (n, rows[n - 1]) for n in range(1, 15001)))
+        self.assertEqual(b'\n'.join(second),
+                         b'\n'.join(b'%d\t%s' % (n, rows[n - 1]) for n in range(5000, 20001)))
+
+    async def test_refresh_waits_for_replies_in_flight(self):
+        # Offsets loaded from a sidecar are released by refresh()
+        LineIndex(self.path, sidecar=True).close()
+        self.server.sidecar = True
+        started = threading.Event()
+        release = threading.Event()
+        read_piece = lineserver.read_piece
+
+        def paused(lines, limit):
+            if started.is_set():
+                release.wait(5)
+            started.set()
+            return read_piece(lines, limit)
+
+        with mock.patch.object(lineserver, 'PIECE_LINES', 10), \
+                mock.patch.object(lineserver, 'read_piece', paused):
+            first = asyncio.ensure_future(self.request(f"GET {self.path} 1-100\n"))
+            await asyncio.to_thread(started.wait, 5)
+            with open(self.path, 'ab') as file:
+                file.write(b'row 101\n')
+            second = asyncio.ensure_future(self.request(f"GET {self.path} 101\n"))
+            await asyncio.sleep(0.05)
+            release.set()
+            self.assertEqual(await first, [b'%d\trow %d' % (n, n) for n in range(1, 101)])
+            self.assertEqual(await second, [b'101\trow 101'])
+
+    async def test_idle_indexes_are_closed(self):
+        self.server.max_open = 1
+        paths = []
+        for name in ('a.txt', 'b.txt'):
+            paths.append(os.path.join(self.directory.name, name))
+            with open(paths[-1], 'wb') as file:
+                file.write(name.encode() + b'\n')
+            self.server.files.add(os.path.realpath(paths[-1]))
+        for path in paths + [self.path]:
+            await self.request(f"GET {path} 1\n")
+        self.assertEqual(list(self.server.indexes), [os.path.realpath(self.path)])
+
+
+if __name__ == '__main__':
+    unittest.main()
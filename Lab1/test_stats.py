@@ -0,0 +1,333 @@
+import io
+import os
+import tempfile
+import unittest
+import random
+from array import array
+from stats import (mean, median, mode, select, select_many, select_median,
+                   quantiles, chunked_median, group_stats, parallel_stats, RunningStats,
+                   RollingStats, StatsSet, HeavyHitters, QuantileSketch, np)
+from filestats import file_stats, read_text_numbers
+
+
+class TestQuantiles(unittest.TestCase):
+
+    def test_select_many(self):
+        rng = random.Random(11)
+        numbers = [rng.randint(0, 50) for _ in range(500)]
+        ordered = sorted(numbers)
+        ks = [0, 17, 250, 251, 499]
+        self.assertEqual(select_many(numbers, ks), [ordered[k] for k in ks])
+
+    def test_methods(self):
+        numbers = [1, 2, 3, 4]
+        self.assertEqual(quantiles(numbers, [0, 0.5, 1]), [1, 2.5, 4])
+        self.assertEqual(quantiles(numbers, [0.5], method='lower'), [2])
+        self.assertEqual(quantiles(numbers, [0.5], method='higher'), [3])
+        self.assertEqual(quantiles(numbers, [0.5], method='midpoint'), [2.5])
+        self.assertEqual(quantiles(numbers, [0.25], method='nearest'), [2])
+        self.assertEqual(quantiles(numbers, [0.9]), [3.7])
+
+    def test_median_agrees(self):
+        for numbers in ([5, 1, 4], [10, 20, 20, 30, 40, 7], array('d', [2.5, 1.5])):
+            self.assertEqual(quantiles(numbers, [0.5])[0], median(numbers))
+
+    def test_bad_arguments(self):
+        self.assertEqual(quantiles([], [0.5, 0.9]), [0, 0])
+        with self.assertRaises(ValueError):
+            quantiles([1, 2], [1.5])
+        with self.assertRaises(ValueError):
+            quantiles([1, 2], [0.5], method='cubic')
+
+
+class TestGroupStats(unittest.TestCase):
+
+    def test_pairs(self):
+        pairs = [('a', 1), ('b', 5), ('a', 3), ('a', 3), ('b', 7)]
+        result = group_stats(pairs)
+        self.assertEqual(result['a'], {'count': 3, 'mean': 7 / 3, 'mode': 3, 'median': 3})
+        self.assertEqual(result['b'], {'count': 2, 'mean': 6, 'mode': 5, 'median': 6})
+        self.assertEqual(group_stats(['a', 'b', 'a', 'a', 'b'], [1, 5, 3, 3, 7]), result)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_columns(self):
+        rng = random.Random(23)
+        keys = [rng.randint(0, 4) for _ in range(300)]
+        values = [rng.randint(0, 9) for _ in range(300)]
+        expected = group_stats(keys, values)
+        result = group_stats(np.array(keys), np.array(values))
+        self.assertEqual(set(result), set(expected))
+        for key, summary in result.items():
+            self.assertEqual(summary['count'], expected[key]['count'])
+            self.assertAlmostEqual(summary['mean'], expected[key]['mean'])
+            self.assertEqual(summary['median'], expected[key]['median'])
+
+
+class TestBufferInput(unittest.TestCase):
+
+    def test_array_module(self):
+        numbers = array('d', [1, 2, 3, 3, 4, 5, 6])
+        self.assertAlmostEqual(mean(numbers), 24 / 7)
+        self.assertEqual(median(numbers), 3)
+        self.assertEqual(mode(numbers), 3)
+        self.assertEqual(mean(array('q')), 0)
+
+    def test_memoryview(self):
+        numbers = memoryview(array('q', [10, 20, 20, 30]))
+        self.assertEqual(median(numbers), 20)
+        self.assertEqual(mode(numbers), 20)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_ndarray_matches_lists(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            numbers = [rng.randint(-5, 5) for _ in range(rng.randint(1, 40))]
+            for values in (np.array(numbers), np.array(numbers, dtype=float)):
+                self.assertAlmostEqual(mean(values), mean(numbers))
+                self.assertEqual(median(values), median(numbers))
+                self.assertEqual(mode(values), mode(numbers))
+
+
+class TestRunningStats(unittest.TestCase):
+
+    def setUp(self):
+        self.numbers = [1, 2, 3, 3, 4, 5, 6]
+
+    def test_matches_list_functions(self):
+        running = RunningStats(iter(self.numbers))
+        self.assertEqual(running.count, 7)
+        self.assertAlmostEqual(running.mean(), mean(self.numbers))
+        self.assertEqual(running.mode(), mode(self.numbers))
+
+    def test_variance(self):
+        running = RunningStats([2, 4, 4, 4, 5, 5, 7, 9])
+        self.assertAlmostEqual(running.variance(), 4.0)
+        self.assertAlmostEqual(running.stdev(), 2.0)
+        self.assertAlmostEqual(running.variance(sample=True), 32 / 7)
+
+    def test_merge(self):
+        left = RunningStats(self.numbers[:3])
+        right = RunningStats(self.numbers[3:])
+        merged = left.merge(right)
+        whole = RunningStats(self.numbers)
+        self.assertEqual(merged.count, whole.count)
+        self.assertAlmostEqual(merged.mean(), whole.mean())
+        self.assertAlmostEqual(merged.variance(), whole.variance())
+        self.assertEqual(merged.mode(), 3)
+
+    def test_empty(self):
+        running = RunningStats()
+        self.assertEqual(running.mean(), 0)
+        self.assertEqual(running.variance(), 0)
+        self.assertEqual(running.mode(), 0)
+        self.assertEqual(running.merge(RunningStats()).count, 0)
+
+
+class TestSelectMedian(unittest.TestCase):
+
+    def test_odd_and_even(self):
+        self.assertEqual(median([1, 2, 3, 3, 4, 5, 6]), 3)
+        self.assertEqual(median([10, 20, 20, 30]), 20)
+        self.assertEqual(select_median([4, 1, 3, 2]), 2.5)
+
+    def test_matches_sorting(self):
+        rng = random.Random(5)
+        for _ in range(200):
+            numbers = [rng.randint(0, 20) for _ in range(rng.randint(1, 100))]
+            ordered = sorted(numbers)
+            k = rng.randrange(len(numbers))
+            self.assertEqual(select(numbers, k), ordered[k])
+            self.assertTrue(all(x <= ordered[k] for x in numbers[:k]))
+            self.assertTrue(all(x >= ordered[k] for x in numbers[k + 1:]))
+
+    def test_copy_leaves_input_alone(self):
+        numbers = [5, 3, 1, 4, 2]
+        self.assertEqual(select_median(numbers, copy=True), 3)
+        self.assertEqual(numbers, [5, 3, 1, 4, 2])
+        self.assertEqual(select_median(numbers), 3)
+        self.assertEqual(numbers[2], 3)
+
+
+class TestRollingStats(unittest.TestCase):
+
+    def test_matches_window(self):
+        rng = random.Random(17)
+        rolling = RollingStats(5)
+        window = []
+        for _ in range(200):
+            number = rng.randint(0, 9)
+            window = (window + [number])[-5:]
+            rolling.push(number)
+            self.assertEqual(rolling.median(), median(window))
+            self.assertAlmostEqual(rolling.mean(), mean(window))
+            self.assertEqual(window.count(rolling.mode()), max(window.count(x) for x in window))
+
+    def test_eviction(self):
+        rolling = RollingStats(2)
+        self.assertIsNone(rolling.push(1))
+        self.assertIsNone(rolling.push(2))
+        self.assertEqual(rolling.push(3), 1)
+        self.assertEqual(len(rolling), 2)
+        self.assertEqual(rolling.median(), 2.5)
+        self.assertEqual(RollingStats(3).median(), 0)
+
+
+class TestStatsSet(unittest.TestCase):
+
+    def test_add_and_remove(self):
+        rng = random.Random(29)
+        numbers = [rng.randint(0, 50) for _ in range(3000)]
+        values = StatsSet(numbers[:1000])
+        for number in numbers[1000:]:
+            values.add(number)
+        for number in numbers[:1500]:
+            values.remove(number)
+
+        remaining = numbers[1500:]
+        self.assertEqual(list(values), sorted(remaining))
+        self.assertEqual(values.median(), median(remaining))
+        self.assertAlmostEqual(values.mean(), mean(remaining))
+        self.assertEqual(remaining.count(values.mode()), max(remaining.count(x) for x in remaining))
+        self.assertEqual(values[-1], max(remaining))
+
+    def test_missing_and_empty(self):
+        values = StatsSet()
+        self.assertEqual(values.median(), 0)
+        with self.assertRaises(ValueError):
+            values.remove(1)
+        values.add(4)
+        values.add(2)
+        self.assertEqual(values.median(), 3)
+        self.assertIn(2, values)
+
+
+class TestHeavyHitters(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(19)
+        self.values = [rng.choice('aab') if rng.random() < 0.5 else rng.randint(0, 10 ** 6)
+                       for _ in range(5000)]
+
+    def test_bounds(self):
+        hitters = HeavyHitters(k=20).update(self.values)
+        self.assertEqual(len(hitters.counters), 20)
+        for value, count, error in hitters.top():
+            exact = self.values.count(value)
+            self.assertLessEqual(exact, count)
+            self.assertLessEqual(count - error, exact)
+            self.assertLessEqual(count - exact, hitters.error_bound)
+        self.assertEqual(hitters.mode(), 'a')
+        self.assertEqual(hitters.exact_mode(self.values), 'a')
+
+    def test_merge(self):
+        left = HeavyHitters(k=20).update(self.values[:2500])
+        right = HeavyHitters(k=20).update(self.values[2500:])
+        merged = left.merge(right)
+        self.assertEqual(merged.count, 5000)
+        self.assertEqual([value for value, _, _ in merged.top(2)], ['a', 'b'])
+        self.assertEqual(HeavyHitters().mode(), 0)
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def rank(self, ordered, value):
+        return sum(1 for x in ordered if x <= value) / len(ordered)
+
+    def test_error_bound(self):
+        rng = random.Random(3)
+        numbers = [rng.random() for _ in range(20000)]
+        ordered = sorted(numbers)
+        sketch = QuantileSketch(error=0.02, seed=3).update(numbers)
+        self.assertLess(len(sketch), len(numbers) // 10)
+        for q in (0.1, 0.5, 0.9):
+            self.assertAlmostEqual(self.rank(ordered, sketch.quantile(q)), q, delta=0.03)
+        self.assertEqual(sketch.quantile(0), ordered[0])
+        self.assertEqual(sketch.percentile(100), ordered[-1])
+
+    def test_merge_and_round_trip(self):
+        numbers = list(range(10000))
+        parts = [QuantileSketch(error=0.02, seed=i).update(numbers[i::4]) for i in range(4)]
+        merged = QuantileSketch.from_dict(parts[0].to_dict())
+        for part in parts[1:]:
+            merged.merge(part)
+        self.assertEqual(merged.count, 10000)
+        self.assertAlmostEqual(merged.median(), 5000, delta=300)
+
+    def test_small_and_empty(self):
+        self.assertEqual(QuantileSketch().median(), 0)
+        self.assertEqual(QuantileSketch().update([1, 2, 3]).median(), 2)
+        with self.assertRaises(ValueError):
+            QuantileSketch(error=0)
+
+
+class TestFileStats(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_matches_in_memory(self):
+        rng = random.Random(13)
+        numbers = array('q', [rng.randint(0, 300) for _ in range(5000)])
+        with open(self.path, 'wb') as file:
+            numbers.tofile(file)
+
+        result = file_stats(self.path, dtype='int64', chunk_size=700)
+        self.assertEqual(result['count'], 5000)
+        self.assertAlmostEqual(result['mean'], mean(list(numbers)))
+        self.assertEqual(result['median'], median(list(numbers)))
+        self.assertEqual(list(numbers).count(result['mode']),
+                         list(numbers).count(mode(list(numbers))))
+
+    def test_workers(self):
+        numbers = array('d', [float(i % 97) for i in range(3001)])
+        with open(self.path, 'wb') as file:
+            numbers.tofile(file)
+
+        result = file_stats(self.path, chunk_size=500, workers=2)
+        self.assertEqual(result['count'], 3001)
+        self.assertEqual(result['median'], median(numbers))
+        self.assertEqual(result['mode'], 0)
+
+        result = parallel_stats(list(numbers), workers=2)
+        self.assertAlmostEqual(result['variance'], RunningStats(numbers).variance())
+        self.assertEqual(result['median'], median(numbers))
+
+    def test_narrowing_passes(self):
+        numbers = [random.Random(1).gauss(0, 1) for _ in range(1001)]
+        chunks = [numbers[i:i + 100] for i in range(0, 1001, 100)]
+        found = chunked_median(chunks, 1001, min(numbers), max(numbers), bins=4, limit=3)
+        self.assertEqual(found, median(numbers))
+
+    def test_large_int64(self):
+        # Nanosecond timestamps are above 2**53, where doubles skip integers
+        base = 1760000000000000000
+        with open(self.path, 'wb') as file:
+            array('q', [base + 2, base, base + 1]).tofile(file)
+        self.assertEqual(file_stats(self.path, dtype='int64')['median'], base + 1)
+
+        numbers = array('q', [2 ** 60 + 1, 2 ** 60 + 3] * 3000)
+        chunks = [numbers[i:i + 700] for i in range(0, len(numbers), 700)]
+        found = chunked_median(chunks, len(numbers), 2 ** 60 + 1, 2 ** 60 + 3, bins=4, limit=100)
+        self.assertEqual(found, 2 ** 60 + 2)
+        found = chunked_median(chunks[:3], 2100, -2 ** 63, 2 ** 63 - 1, bins=4, limit=100)
+        self.assertEqual(found, 2 ** 60 + 2)
+
+    def test_text_blocks(self):
+        stream = io.BytesIO(b"12 345 6\n78\t9 ")
+        numbers, size = read_text_numbers(stream, block_size=3)
+        self.assertEqual(list(numbers), [12, 345, 6, 78, 9])
+        self.assertEqual(size, 14)
+        with self.assertRaises(ValueError):
+            read_text_numbers(io.BytesIO(b"1 two 3"))
+
+    def test_empty_file(self):
+        with self.assertRaises(ValueError):
+            file_stats(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
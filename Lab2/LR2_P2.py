@@ -1,11 +1,18 @@
+import os
+import sys
+
+# The line index lives with the Lab 1 viewer; use that module rather than a copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab1'))
+
+from lineindex import LineIndex
+
+
 def main():
     filename = input("Enter the filename: ")
     
     try:
-        with open(filename, 'r') as file:
-            lines = file.readlines()
-        
-        lines = [line.rstrip('\n') for line in lines]
+        # Only newline offsets are loaded; lines are read on demand
+        lines = LineIndex(filename)
         print(f"File '{filename}' loaded successfully!")
         print()
         
@@ -35,8 +42,10 @@ def main():
             print()
             continue
         
-        print(f"Line {line_number}: {lines[line_number - 1]}")
+        print(f"Line {line_number}: {lines.line(line_number)}")
         print()
+    
+    lines.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,247 @@
+"""
+File: csvpipeline.py
+
+Streams a CSV file through a chain of transform stages, reading the
+input once and writing the output once, with no intermediate files.
+
+Rows are read in batches and each batch is turned into columns, so a
+stage works on whole column lists: splitting 'makes-attempts' values is
+one join and one split per column, filtering is one map and one
+compress, and selecting columns only rearranges references. A stage is
+a function (names, batches) -> (names, batches) over the header names
+and a generator of batches; stages compose by feeding one into the next.
+
+    python csvpipeline.py rawbrogdonstats.csv clean.csv --split FG,3PT,FT \\
+        --where "PTS>=20" --select MIN,FGM,FGA,PTS
+
+The same steps as cleanStats in hoopsstatsapp.py, without pandas:
+
+    python csvpipeline.py rawbrogdonstats.csv cleanbrogdonstats.csv --split FG,3PT,FT
+"""
+
+import argparse
+import csv
+import itertools
+import operator
+import re
+
+BATCH_ROWS = 1 << 14
+WRITE_BUFFER = 1 << 22
+
+# Column names cleanStats gives the makes and attempts of each split column
+SPLIT_NAMES = {
+    'FG': ('FGM', 'FGA'),
+    '3PT': ('3PM', '3PA'),
+    'FT': ('FTM', 'FTA'),
+}
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>=': operator.ge,
+    '>': operator.gt,
+}
+
+
+def readBatches(reader, width, batchRows=BATCH_ROWS):
+    """Yield batches of rows from a csv reader as lists of width columns.
+
+    Short rows are padded with blanks and extra fields are dropped.
+    """
+    while True:
+        rows = list(itertools.islice(reader, batchRows))
+        if not rows:
+            return
+        columns = list(itertools.zip_longest(*rows, fillvalue=''))[:width]
+        columns.extend([('',) * len(rows)] * (width - len(columns)))
+        yield columns
+
+
+def reverseWindow(size):
+    """Stage reversing the order of the rows within each run of size rows."""
+    def stage(names, batches):
+        def run():
+            pending = [[] for _ in names]
+            for batch in batches:
+                for column, values in zip(pending, batch):
+                    column.extend(values)
+                start = 0
+                while pending and len(pending[0]) - start >= size:
+                    yield [column[start:start + size][::-1] for column in pending]
+                    start += size
+                pending = [column[start:] for column in pending]
+            if pending and pending[0]:
+                yield [column[::-1] for column in pending]
+        return names, run()
+    return stage
+
+
+def splitPairs(values, name):
+    """Makes and attempts lists for a column of 'makes-attempts' values."""
+    dashes = list(map(str.count, values, itertools.repeat('-')))
+    if dashes.count(1) != len(values):
+        raise ValueError(f"Column {name} has values that are not 'makes-attempts'")
+    parts = '-'.join(values).split('-')
+    return parts[0::2], parts[1::2]
+
+
+def splitColumns(columns):
+    """Stage replacing each 'M-A' column by makes and attempts columns in its place.
+
+    Columns missing from the header are skipped, as cleanStats does.
+    """
+    def stage(names, batches):
+        positions = {names.index(name) for name in columns if name in names}
+        newNames = []
+        for position, name in enumerate(names):
+            if position in positions:
+                newNames.extend(SPLIT_NAMES.get(name, (name + 'M', name + 'A')))
+            else:
+                newNames.append(name)
+
+        def run():
+            for batch in batches:
+                newBatch = []
+                for position, values in enumerate(batch):
+                    if position in positions:
+                        newBatch.extend(splitPairs(values, names[position]))
+                    else:
+                        newBatch.append(values)
+                yield newBatch
+        return newNames, run()
+    return stage
+
+
+def toFloat(value):
+    try:
+        return float(value)
+    except ValueError:
+        return float('nan')
+
+
+def filterRows(column, op, value):
+    """Stage keeping the rows where op(column value, value) holds.
+
+    A numeric value compares the column as numbers, and blanks or other
+    text never match, not even with '!='. A string value compares the
+    column as text.
+    """
+    def stage(names, batches):
+        if column not in names:
+            raise ValueError(f"No column '{column}' in {names}")
+        position = names.index(column)
+
+        def run():
+            for batch in batches:
+                values = batch[position]
+                if isinstance(value, str):
+                    keys = values
+                else:
+                    try:
+                        keys = list(map(float, values))
+                    except ValueError:
+                        keys = list(map(toFloat, values))
+                mask = map(op, keys, itertools.repeat(value))
+                if keys is not values:
+                    # NaN keys (blanks, text) would otherwise pass '!='
+                    mask = map(operator.and_, mask, map(operator.eq, keys, keys))
+                mask = list(mask)
+                if not any(mask):
+                    continue
+                if all(mask):
+                    yield batch
+                else:
+                    yield [list(itertools.compress(values, mask)) for values in batch]
+        return names, run()
+    return stage
+
+
+def whereRows(text):
+    """filterRows stage for an expression like 'PTS>=20' or 'MIN!=0'."""
+    match = re.fullmatch(r'\s*(.+?)\s*(<=|>=|==|!=|<|>)\s*(.*?)\s*', text)
+    if match is None:
+        raise ValueError(f"Expected <column><op><value> with op one of {list(OPERATORS)}: {text}")
+    column, symbol, value = match.groups()
+    try:
+        value = float(value)
+    except ValueError:
+        pass
+    return filterRows(column, OPERATORS[symbol], value)
+
+
+def selectColumns(columns):
+    """Stage keeping only the named columns, in the order given."""
+    def stage(names, batches):
+        for name in columns:
+            if name not in names:
+                raise ValueError(f"No column '{name}' in {names}")
+        positions = [names.index(name) for name in columns]
+        return list(columns), ([batch[position] for position in positions] for batch in batches)
+    return stage
+
+
+def runPipeline(inFileName, outFileName, stages, batchRows=BATCH_ROWS):
+    """Read inFileName once, pass it through stages and write outFileName.
+
+    Returns the number of rows written after the header.
+    """
+    with open(inFileName, newline='') as inFile, \
+            open(outFileName, 'w', newline='', buffering=WRITE_BUFFER) as outFile:
+        reader = csv.reader(inFile)
+        names = next(reader, [])
+        batches = readBatches(reader, len(names), batchRows)
+        for stage in stages:
+            names, batches = stage(names, batches)
+
+        writer = csv.writer(outFile)
+        writer.writerow(names)
+        count = 0
+        for batch in batches:
+            rows = list(zip(*batch))
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def columnList(text):
+    return [name.strip() for name in text.split(',') if name.strip()]
+
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Transform a CSV file in one pass; stages run in the order given.")
+    parser.add_argument('input', help="CSV file to read")
+    parser.add_argument('output', help="CSV file to write")
+    parser.add_argument('--reverse-window', dest='stages', action='append', metavar='N',
+                        type=lambda text: reverseWindow(int(text)),
+                        help="reverse the order of the rows within each run of N rows")
+    parser.add_argument('--split', dest='stages', action='append', metavar='COLUMNS',
+                        type=lambda text: splitColumns(columnList(text)),
+                        help="split 'makes-attempts' columns, e.g. FG,3PT,FT")
+    parser.add_argument('--where', dest='stages', action='append', metavar='EXPR',
+                        type=whereRows, help="keep rows matching e.g. 'PTS>=20'")
+    parser.add_argument('--select', dest='stages', action='append', metavar='COLUMNS',
+                        type=lambda text: selectColumns(columnList(text)),
+                        help="keep and reorder columns, e.g. PTS,MIN")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS,
+                        help=f"rows per batch (default: {BATCH_ROWS})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArgs(argv)
+    try:
+        count = runPipeline(args.input, args.output, args.stages or [], args.batch_rows)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    print(f"Wrote {count} row(s) to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+File: csvsort.py
+
+Sorts the rows of a CSV file by one column while keeping the first
+header line in place, for files too large to sort in memory.
+
+The rows after the header are cut into byte ranges of about RUN_BYTES.
+Each range is read, sorted and written to a temporary run file by a pool
+of worker processes, then all runs are merged with a heap in one pass
+(more when there are over MAX_OPEN of them). Rows are copied exactly as
+they appear in the input, and equal keys keep their original order.
+Every row must fit on one line, as in the exported stats files.
+
+    python csvsort.py rawbrogdonstats.csv sorted.csv --key PTS --numeric --reverse
+"""
+
+import argparse
+import csv
+import heapq
+import itertools
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+RUN_BYTES = 1 << 26
+MAX_OPEN = 128
+WRITE_BUFFER = 1 << 22
+
+
+def makeKey(column, numeric):
+    """Function from a parsed row to its sort key.
+
+    Numeric keys put values that are not numbers (blank, '-') after all
+    the numbers, ordered as text among themselves; with reverse they
+    come before the numbers, in reverse text order.
+    """
+    def key(row):
+        value = row[column] if column < len(row) else ''
+        if not numeric:
+            return value
+        try:
+            return (0, float(value), '')
+        except ValueError:
+            return (1, 0.0, value)
+    return key
+
+
+def keyedLines(lines, key):
+    """Yield (key, line) for an iterable of one-row CSV lines."""
+    lines, parsed = itertools.tee(lines)
+    for line, row in zip(lines, csv.reader(parsed)):
+        yield key(row), line
+
+
+def readLines(data):
+    """Split decoded text into lines that all end with a newline."""
+    lines = data.split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last + '\n')
+    return lines
+
+
+def sortRun(inFileName, start, end, runFileName, column, numeric, reverse):
+    """Sort the rows in bytes start to end of the input into a run file."""
+    with open(inFileName, 'rb') as inFile:
+        inFile.seek(start)
+        data = inFile.read(end - start).decode('utf-8')
+    lines = readLines(data)
+    keyed = list(keyedLines(lines, makeKey(column, numeric)))
+    keyed.sort(key=itemgetter(0), reverse=reverse)
+    with open(runFileName, 'w', encoding='utf-8', newline='', buffering=WRITE_BUFFER) as runFile:
+        runFile.writelines(line for _, line in keyed)
+    return runFileName
+
+
+def runRanges(inFile, start, runBytes):
+    """(start, end) byte ranges after start, each ending at a line boundary."""
+    inFile.seek(0, 2)
+    size = inFile.tell()
+    ranges = []
+    while start < size:
+        inFile.seek(min(start + runBytes, size))
+        inFile.readline()
+        end = min(inFile.tell(), size)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def mergeRuns(runFileNames, outFile, column, numeric, reverse):
+    """Merge sorted run files into an open output file."""
+    key = makeKey(column, numeric)
+    runFiles = [open(name, encoding='utf-8', newline='') for name in runFileNames]
+    try:
+        merged = heapq.merge(*(keyedLines(runFile, key) for runFile in runFiles),
+                             key=itemgetter(0), reverse=reverse)
+        outFile.writelines(line for _, line in merged)
+    finally:
+        for runFile in runFiles:
+            runFile.close()
+
+
+def sortFile(inFileName, outFileName, key, numeric=False, reverse=False,
+             runBytes=RUN_BYTES, workers=None, tempDir=None):
+    """Write inFileName to outFileName with the rows after the header sorted.
+
+    key is a column name from the header or a column number from 0.
+    Returns the number of run files that were merged.
+    """
+    with open(inFileName, 'rb') as inFile:
+        header = inFile.readline()
+        names = next(csv.reader([header.decode('utf-8')]), [])
+        if key in names:
+            column = names.index(key)
+        elif key.isdigit() and int(key) < len(names):
+            column = int(key)
+        else:
+            raise ValueError(f"No column '{key}' in {names}")
+        ranges = runRanges(inFile, inFile.tell(), runBytes)
+
+    with tempfile.TemporaryDirectory(dir=tempDir) as directory:
+        runFileNames = [os.path.join(directory, f'run{number}.csv')
+                        for number in range(len(ranges))]
+        tasks = [(inFileName, start, end, runFileName, column, numeric, reverse)
+                 for (start, end), runFileName in zip(ranges, runFileNames)]
+        if workers == 1 or len(tasks) < 2:
+            for task in tasks:
+                sortRun(*task)
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                list(pool.map(sortRun, *zip(*tasks)))
+        runCount = len(runFileNames)
+
+        # Merge groups of runs into longer ones until they can all be open at once
+        while len(runFileNames) > MAX_OPEN:
+            merged = []
+            for first in range(0, len(runFileNames), MAX_OPEN):
+                group = runFileNames[first:first + MAX_OPEN]
+                name = os.path.join(directory, f'merge{len(merged)}-{os.path.basename(group[0])}')
+                with open(name, 'w', encoding='utf-8', newline='',
+                          buffering=WRITE_BUFFER) as mergeFile:
+                    mergeRuns(group, mergeFile, column, numeric, reverse)
+                for runFileName in group:
+                    os.remove(runFileName)
+                merged.append(name)
+            runFileNames = merged
+
+        with open(outFileName, 'w', encoding='utf-8', newline='',
+                  buffering=WRITE_BUFFER) as outFile:
+            outFile.write(header.decode('utf-8'))
+            if header and not header.endswith(b'\n'):
+                outFile.write('\n')
+            mergeRuns(runFileNames, outFile, column, numeric, reverse)
+    return runCount
+
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(description="Sort a CSV file by one column, header first.")
+    parser.add_argument('input', help="CSV file to sort")
+    parser.add_argument('output', help="file to write the sorted rows to")
+    parser.add_argument('--key', required=True, help="column name, or column number from 0")
+    parser.add_argument('--numeric', action='store_true', help="compare the column as numbers")
+    parser.add_argument('--reverse', action='store_true', help="largest first")
+    parser.add_argument('--run-mb', type=float, default=RUN_BYTES / (1 << 20),
+                        help="input per sorted run in MB (default: 64)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="processes sorting runs (default: one per CPU)")
+    parser.add_argument('--temp-dir', help="where to keep the runs (default: system temp)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parseArgs(argv)
+    try:
+        runs = sortFile(args.input, args.output, args.key, args.numeric, args.reverse,
+                        max(1, int(args.run_mb * (1 << 20))), args.workers, args.temp_dir)
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found.")
+        return
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    print(f"Sorted '{args.input}' into '{args.output}' using {runs} run(s).")
+
+
+if __name__ == "__main__":
+    main()
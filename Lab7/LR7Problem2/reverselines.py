@@ -3,21 +3,61 @@ File: reverselines.py
 
 Reverses the lines in a CSV file while
 keeping the first header line in place.
+
+The file is read backwards in fixed-size blocks, so memory use stays
+the same however large the file is.
 """
 
-inFileName = input("Input file name: ")
-outFileName = input("Output file name: ")
-inFile = open(inFileName, 'r')
-lyst = []
-header = inFile.readline()
-while True:
-    line = inFile.readline()
-    if line == "":
-        break
-    lyst.append(line)
-lyst.reverse()
-outFile = open(outFileName, 'w')
-outFile.write(header)
-for line in lyst:
-    outFile.write(line)
-outFile.close()
+BLOCK_SIZE = 1 << 20
+WRITE_BUFFER = 1 << 22
+
+
+def reversedBlocks(inFile, start, blockSize=BLOCK_SIZE):
+    """Yield the lines of a binary file after offset start, last line first.
+
+    Blocks are read from the end of the file towards start. A line cut
+    in two by a block boundary is carried over and completed by the next
+    block. Each yielded chunk holds whole lines, each ending in a newline.
+    """
+    inFile.seek(0, 2)
+    position = inFile.tell()
+    hasLines = position > start
+    if hasLines:
+        inFile.seek(position - 1)
+        if inFile.read(1) == b'\n':
+            # The final newline ends the last line rather than starting a new one
+            position -= 1
+
+    carry = b''
+    while position > start:
+        size = min(blockSize, position - start)
+        position -= size
+        inFile.seek(position)
+        lines = (inFile.read(size) + carry).split(b'\n')
+        carry = lines[0]
+        if len(lines) > 1:
+            yield b'\n'.join(reversed(lines[1:])) + b'\n'
+    if hasLines:
+        yield carry + b'\n'
+
+
+def reverseFile(inFileName, outFileName, blockSize=BLOCK_SIZE):
+    """Write inFileName to outFileName with the lines after the header reversed."""
+    with open(inFileName, 'rb') as inFile, \
+            open(outFileName, 'wb', buffering=WRITE_BUFFER) as outFile:
+        header = inFile.readline()
+        outFile.write(header)
+        if header and not header.endswith(b'\n'):
+            return
+        for chunk in reversedBlocks(inFile, inFile.tell(), blockSize):
+            outFile.write(chunk)
+
+
+def main():
+    inFileName = input("Input file name: ")
+    outFileName = input("Output file name: ")
+    reverseFile(inFileName, outFileName)
+
+
+if __name__ == "__main__":
+    main()
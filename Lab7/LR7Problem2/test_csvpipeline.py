@@ -0,0 +1,67 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import csvpipeline
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestCsvPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, 'in.csv')
+        self.output = os.path.join(self.directory.name, 'out.csv')
+        self.write('A,B\n1,x\n,y\n2,z\n-,w\n3,v\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text):
+        with open(self.input, 'w', newline='') as file:
+            file.write(text)
+
+    def run_main(self, *argv, input=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            csvpipeline.main([input or self.input, self.output, *argv])
+        with open(self.output, newline='') as file:
+            return file.read()
+
+    def test_split_matches_clean_stats(self):
+        self.run_main('--split', 'FG,3PT,FT', '--batch-rows', '7',
+                      input=os.path.join(HERE, 'rawbrogdonstats.csv'))
+        with open(self.output, 'rb') as file, \
+                open(os.path.join(HERE, 'cleanbrogdonstats.csv'), 'rb') as clean:
+            self.assertEqual(file.read(), clean.read())
+
+    def test_where(self):
+        self.assertEqual(self.run_main('--where', 'A>=2'), 'A,B\r\n2,z\r\n3,v\r\n')
+        self.assertEqual(self.run_main('--where', 'A!=1'), 'A,B\r\n2,z\r\n3,v\r\n')
+        self.assertEqual(self.run_main('--where', 'B==y'), 'A,B\r\n,y\r\n')
+        self.assertEqual(self.run_main('--where', 'A>5'), 'A,B\r\n')
+
+    def test_where_blank_values_never_match(self):
+        self.write('A,B\n,y\n-,w\n')
+        self.assertEqual(self.run_main('--where', 'A!=1', '--batch-rows', '1'), 'A,B\r\n')
+
+    def test_select(self):
+        self.assertEqual(self.run_main('--select', 'B,A', '--where', 'A<2'), 'B,A\r\nx,1\r\n')
+        with self.assertRaises(ValueError):
+            list(csvpipeline.selectColumns(['C'])(['A', 'B'], iter([])))
+
+    def test_reverse_window(self):
+        self.assertEqual(self.run_main('--reverse-window', '2', '--batch-rows', '3'),
+                         'A,B\r\n,y\r\n1,x\r\n-,w\r\n2,z\r\n3,v\r\n')
+        self.assertEqual(self.run_main('--reverse-window', '10', '--select', 'B'),
+                         'B\r\nv\r\nw\r\nz\r\ny\r\nx\r\n')
+
+    def test_split_rejects_bad_values(self):
+        self.write('FG\n1-2\n3\n')
+        with self.assertRaisesRegex(ValueError, 'makes-attempts'):
+            csvpipeline.runPipeline(self.input, self.output, [csvpipeline.splitColumns(['FG'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
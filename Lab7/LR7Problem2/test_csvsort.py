@@ -0,0 +1,92 @@
+import csv
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import csvsort
+from csvsort import sortFile
+
+
+class TestCsvSort(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, 'in.csv')
+        self.output = os.path.join(self.directory.name, 'out.csv')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, lines):
+        with open(self.input, 'w', newline='') as file:
+            file.write(''.join(lines))
+
+    def read(self):
+        with open(self.output, newline='') as file:
+            return file.readlines()
+
+    def expected(self, lines, column, numeric=False, reverse=False):
+        key = csvsort.makeKey(column, numeric)
+        rows = lines[1:]
+        return lines[:1] + sorted(rows, key=lambda line: key(next(csv.reader([line]))),
+                                  reverse=reverse)
+
+    def sample(self, count):
+        rng = random.Random(count)
+        values = ['', '-', 'n/a'] + [str(n) for n in range(-5, 20)] + ['2.5', '10.0']
+        return ['NAME,PTS\n'] + [f'p{number},{rng.choice(values)}\n' for number in range(count)]
+
+    def test_single_run(self):
+        lines = self.sample(50)
+        self.write(lines)
+        self.assertEqual(sortFile(self.input, self.output, 'PTS'), 1)
+        self.assertEqual(self.read(), self.expected(lines, 1))
+
+    def test_many_runs_and_merge_passes(self):
+        lines = self.sample(400)
+        self.write(lines)
+        for numeric in (False, True):
+            for reverse in (False, True):
+                with self.subTest(numeric=numeric, reverse=reverse), \
+                        mock.patch.object(csvsort, 'MAX_OPEN', 3):
+                    runs = sortFile(self.input, self.output, '1', numeric, reverse,
+                                    runBytes=200, workers=1)
+                    self.assertGreater(runs, 3 * 3)
+                    self.assertEqual(self.read(), self.expected(lines, 1, numeric, reverse))
+
+    def test_worker_processes(self):
+        lines = self.sample(200)
+        self.write(lines)
+        self.assertGreater(sortFile(self.input, self.output, 'PTS', True, runBytes=300,
+                                    workers=2), 1)
+        self.assertEqual(self.read(), self.expected(lines, 1, True))
+
+    def test_numeric_with_text_values(self):
+        self.write(['A,B\n', 'a,10\n', 'b,-\n', 'c,2\n', 'd,\n', 'e,-1.5\n', 'f,x\n'])
+        sortFile(self.input, self.output, 'B', numeric=True, runBytes=8, workers=1)
+        self.assertEqual(self.read(), ['A,B\n', 'e,-1.5\n', 'c,2\n', 'a,10\n',
+                                       'd,\n', 'b,-\n', 'f,x\n'])
+        sortFile(self.input, self.output, 'B', numeric=True, reverse=True, runBytes=8, workers=1)
+        self.assertEqual(self.read(), ['A,B\n', 'f,x\n', 'b,-\n', 'd,\n',
+                                       'a,10\n', 'c,2\n', 'e,-1.5\n'])
+
+    def test_reverse_keeps_equal_keys_in_order(self):
+        lines = ['K,N\n'] + [f'{key},{number}\n' for number, key in enumerate('3132312213')]
+        self.write(lines)
+        for runBytes in (1, 10, 1 << 20):
+            with self.subTest(runBytes=runBytes):
+                sortFile(self.input, self.output, 'K', True, True, runBytes=runBytes, workers=1)
+                self.assertEqual(self.read(), ['K,N\n', '3,0\n', '3,2\n', '3,4\n', '3,9\n',
+                                               '2,3\n', '2,6\n', '2,7\n',
+                                               '1,1\n', '1,5\n', '1,8\n'])
+
+    def test_unknown_key(self):
+        self.write(['A,B\n', '1,2\n'])
+        with self.assertRaises(ValueError):
+            sortFile(self.input, self.output, 'C')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from reverselines import reverseFile
+
+
+class TestReverseLines(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, 'in.csv')
+        self.output = os.path.join(self.directory.name, 'out.csv')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def reverse(self, data, blockSize):
+        with open(self.input, 'wb') as file:
+            file.write(data)
+        reverseFile(self.input, self.output, blockSize)
+        with open(self.output, 'rb') as file:
+            return file.read()
+
+    def check(self, data, expected):
+        for blockSize in (1, 2, 3, 5, 1 << 20):
+            with self.subTest(blockSize=blockSize):
+                self.assertEqual(self.reverse(data, blockSize), expected)
+
+    def test_lines(self):
+        self.check(b'H\na\nbb\n\nccc\n', b'H\nccc\n\nbb\na\n')
+
+    def test_no_trailing_newline(self):
+        self.check(b'H\na\nbb', b'H\nbb\na\n')
+
+    def test_header_only(self):
+        self.check(b'H,I\n', b'H,I\n')
+        self.check(b'H,I', b'H,I')
+
+    def test_empty_file(self):
+        self.check(b'', b'')
+
+    def test_crlf(self):
+        self.check(b'H\r\na,1\r\nb,2\r\n\r\nc,3\r\n', b'H\r\nc,3\r\n\r\nb,2\r\na,1\r\n')
+
+
+if __name__ == '__main__':
+    unittest.main()